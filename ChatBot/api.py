@@ -1,11 +1,26 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+from enum import Enum
+import msgspec
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-from chatbotlogic import get_rag_response, get_basic_response, load_vector_store, get_hybrid_retriever
+from chatbotlogic import get_rag_response, get_basic_response, stream_rag_response, load_vector_store, get_hybrid_retriever
+
+# Application log config. LOG_LEVEL=DEBUG adds the per-request [TIMING]/[CACHE]
+# lines; the default INFO keeps the request path free of log writes.
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
 
 # Create FastAPI app
-app = FastAPI(title="PakLaw ChatBot API")
+# orjson serializes the response + sources list much faster than stdlib json
+app = FastAPI(title="PakLaw ChatBot API", default_response_class=ORJSONResponse)
 
 # ─── PRELOAD AT STARTUP ───
 # Load embeddings + vector store + hybrid retriever ONCE when server starts.
@@ -34,34 +49,80 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],  # React dev server
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["content-type", "authorization"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
-# Category to law_type mapping
-# Values MUST match the 'department' metadata in the vector store (case-sensitive!)
-CATEGORY_FILTER_MAP = {
-    "cyber": "Pta_Laws",                # PTA/Cyber laws (1984 chunks)
-    "criminal": "Criminal_Laws",        # Criminal Laws (1109 chunks)
-    "Family": "Family_Laws",            # Family Laws (455 chunks)
-    "labour": "Labour_Laws",            # Labour Laws (1584 chunks)
-    "Property": "Land_Property_Laws",   # Property Laws (416 chunks)
-    "constitutional": None,             # Constitution (no filter, search all)
-    "general": None,                    # General query (no filter, search all)
+# UI category keys, lowercase — incoming ids are matched case-insensitively
+# (the frontend sends e.g. "Family" and "Property")
+class Category(str, Enum):
+    CYBER = "cyber"
+    CRIMINAL = "criminal"
+    FAMILY = "family"
+    LABOUR = "labour"
+    PROPERTY = "property"
+    CONSTITUTIONAL = "constitutional"
+    GENERAL = "general"
+
+# Category to metadata filter mapping, built once at import
+# Department values MUST match the 'department' metadata in the vector store (case-sensitive!)
+CATEGORY_FILTERS: Dict[Category, Optional[dict]] = {
+    Category.CYBER: {"department": "Pta_Laws"},                  # PTA/Cyber laws (1984 chunks)
+    Category.CRIMINAL: {"department": "Criminal_Laws"},          # Criminal Laws (1109 chunks)
+    Category.FAMILY: {"department": "Family_Laws"},              # Family Laws (455 chunks)
+    Category.LABOUR: {"department": "Labour_Laws"},              # Labour Laws (1584 chunks)
+    Category.PROPERTY: {"department": "Land_Property_Laws"},     # Property Laws (416 chunks)
+    Category.CONSTITUTIONAL: None,                               # Constitution (no filter, search all)
+    Category.GENERAL: None,                                      # General query (no filter, search all)
 }
 
-# Request model
-class ChatRequest(BaseModel):
+# Request model (msgspec Struct — decoded and validated in C, much cheaper than Pydantic)
+class ChatRequest(msgspec.Struct):
     message: str
     use_rag: bool = True
-    category: Optional[str] = None  # Category for filtering
+    # Category for filtering. Decoded as a string; parse_chat_request swaps in
+    # the matching Category member (case-insensitive)
+    category: Optional[str] = None
+
+_chat_request_decoder = msgspec.json.Decoder(ChatRequest)
+
+
+async def parse_chat_request(request: Request) -> ChatRequest:
+    """Decode the raw JSON body into ChatRequest, bypassing FastAPI's Pydantic body parser"""
+    body = await request.body()
+    try:
+        chat_request = _chat_request_decoder.decode(body)
+    except msgspec.ValidationError as e:
+        # Wrong shape or field type (including a non-string category)
+        raise HTTPException(status_code=422, detail=str(e))
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+
+    # Unknown category: reject before any embedding/LLM work instead of
+    # silently running an unfiltered full-corpus search
+    if chat_request.category is not None:
+        try:
+            chat_request.category = Category(chat_request.category.lower())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid category")
+    return chat_request
 
-# Response model
+# Response model (documents the /api/chat schema; responses are serialized directly)
 class ChatResponse(BaseModel):
     response: str
     sources: List[Dict[str, Any]] = []
     context_used: bool = False
 
+
+def chat_response(response: str, sources: Optional[List[Dict[str, Any]]] = None, context_used: bool = False) -> ORJSONResponse:
+    """Serialize a chat reply straight to JSON, skipping model validation and jsonable_encoder"""
+    return ORJSONResponse({
+        "response": response,
+        "sources": sources or [],
+        "context_used": context_used
+    })
+
 @app.get("/")
 async def root():
     return {"message": "PakLaw ChatBot API is running!"}
@@ -70,34 +131,79 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
-@app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+# Returning an ORJSONResponse directly skips FastAPI's response validation and
+# jsonable_encoder pass; the schema is still documented via `responses`
+@app.post("/api/chat", response_model=None, responses={200: {"model": ChatResponse}})
+async def chat(request: ChatRequest = Depends(parse_chat_request)):
     """Handle chat messages and return responses from RAG pipeline"""
     try:
         if request.use_rag:
-            # Get filter based on category
-            category_filter = None
-            if request.category and request.category in CATEGORY_FILTER_MAP:
-                filter_value = CATEGORY_FILTER_MAP[request.category]
-                if filter_value:
-                    category_filter = {"department": filter_value}
+            # Get filter based on category (already validated by the decoder)
+            category = request.category
+            category_filter = CATEGORY_FILTERS[category] if category else None
             
-            result = get_rag_response(
+            # The RAG pipeline is blocking (embedding + Groq HTTP call),
+            # so run it in a worker thread to keep the event loop free
+            result = await asyncio.to_thread(
+                get_rag_response,
                 request.message,
                 category_filter=category_filter,
-                category=request.category  # pass category name for prompt awareness
+                category=category.value if category else None  # pass category name for prompt awareness
             )
-            return ChatResponse(
-                response=result["response"],
+            return chat_response(
+                result["response"],
                 sources=result.get("sources", []),
                 context_used=result.get("context_used", False)
             )
         else:
-            response = get_basic_response(request.message)
-            return ChatResponse(response=response)
+            response = await asyncio.to_thread(get_basic_response, request.message)
+            return chat_response(response)
     except Exception as e:
-        return ChatResponse(
-            response=f"Sorry, an error occurred: {str(e)}",
-            sources=[],
-            context_used=False
-        )
\ No newline at end of file
+        return chat_response(f"Sorry, an error occurred: {str(e)}")
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest = Depends(parse_chat_request)):
+    """Stream the answer as Server-Sent Events so the first token arrives early"""
+    def event_source():
+        try:
+            if request.use_rag:
+                category = request.category
+                events = stream_rag_response(
+                    request.message,
+                    category_filter=CATEGORY_FILTERS[category] if category else None,
+                    category=category.value if category else None
+                )
+            else:
+                events = iter([
+                    {"type": "sources", "sources": [], "context_used": False},
+                    {"type": "token", "content": get_basic_response(request.message)},
+                    {"type": "done"},
+                ])
+            for event in events:
+                yield b"data: " + orjson.dumps(event) + b"\n\n"
+        except Exception as e:
+            error = {"type": "error", "content": f"Sorry, an error occurred: {str(e)}"}
+            yield b"data: " + orjson.dumps(error) + b"\n\n"
+
+    # Sync generator — Starlette iterates it in a threadpool.
+    # X-Accel-Buffering stops the Nginx proxy from buffering the stream.
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # uvloop (libuv event loop) + httptools (C HTTP parser) instead of the
+    # pure-Python asyncio loop and h11 parser
+    uvicorn.run(
+        "api:app",
+        host="0.0.0.0",
+        port=5000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "2"))
+    )
@@ -1,29 +1,60 @@
+import importlib
+import logging
 import os
+import re
+import threading
 import time
-from typing import Dict, Optional, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Optional, List, Tuple
+import httpx
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
+from semantic_cache import LRUCache, SemanticCache, normalize_query
+
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+    from retriever import HybridRetriever
+    from vector_store import VectorStoreManager
 
 # Load environment variables
 load_dotenv()
 
-# Try to import RAG components
-RAG_AVAILABLE = False
-HYBRID_AVAILABLE = False
+# Library-style logger: silent unless the entrypoint configures logging.
+# Per-request timing/cache messages are DEBUG, so at the default level the
+# request path does no formatting or stdout writes.
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
-try:
-    from vector_store import VectorStoreManager
-    RAG_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️ Vector store not available: {e}")
+# RAG components are imported lazily on first use: vector_store pulls in
+# Chroma + sentence-transformers (torch), and langchain_groq the Groq SDK,
+# which would otherwise load at import time even for basic-mode callers
+_rag_import_lock = threading.Lock()
+_rag_modules: Optional[Dict[str, Any]] = None
 
-try:
-    from retriever import HybridRetriever, build_bm25_from_vectorstore
-    HYBRID_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️ Hybrid retriever not available: {e}. Using basic search.")
+
+def _import_rag_components() -> Dict[str, Any]:
+    """Import the vector store / retriever modules once; missing ones are left out"""
+    global _rag_modules
+    if _rag_modules is not None:
+        return _rag_modules
+    with _rag_import_lock:
+        if _rag_modules is None:
+            modules = {}
+            try:
+                modules["vector_store"] = importlib.import_module("vector_store")
+            except ImportError as e:
+                logger.warning("Vector store not available: %s", e)
+            try:
+                modules["retriever"] = importlib.import_module("retriever")
+            except ImportError as e:
+                logger.warning("Hybrid retriever not available: %s. Using basic search.", e)
+            _rag_modules = modules
+    return _rag_modules
+
+
+def rag_available() -> bool:
+    """True if the vector store components can be imported"""
+    return "vector_store" in _import_rag_components()
 
 # Load API key and models from .env
 groq_api_key = os.getenv("GROQ_API_KEY") 
@@ -84,6 +115,23 @@ GREETING_PATTERNS = {
     'bye', 'goodbye', 'see you', 'good night'
 }
 
+# Compiled once. Whole-word match so "hi" no longer fires inside "which"/"this";
+# "salam" forms may run on ("assalamualaikum").
+_GREETING_RE = re.compile(
+    r"\b(?:" + "|".join(re.escape(p) for p in sorted(GREETING_PATTERNS, key=len, reverse=True)) + r")(?:\b|(?<=salam))"
+)
+
+# A short query mentioning any of these is treated as legal even if it also greets
+_LEGAL_KEYWORD_RE = re.compile(
+    r"\b(?:laws?|legal|article|section|court|fir|act|constitution|penal|ppc|crpc|civil|criminal|"
+    r"bail|rights?|divorce|khula|talaq|nikah|custody|inheritance|property|tenant|wages?|"
+    r"cyber|peca|contract|lawyer|punishment|offen[cs]e|crime)\b"
+)
+
+_MATH_PREFIX_RE = re.compile(r"^(what\s+is|calculate|solve|whats|what\'s)\s*")
+_MATH_EXPR_RE = re.compile(r"^[\d\s+\-*/().^%=]+$")
+
+
 def is_off_topic(query: str) -> bool:
     """
     Fast check: Is this query clearly NOT a legal question?
@@ -92,49 +140,18 @@ def is_off_topic(query: str) -> bool:
     """
     q = query.strip().lower()
     
-    # Very short queries (1-3 words) that are greetings
-    if len(q.split()) <= 4:
-        for pattern in GREETING_PATTERNS:
-            if pattern in q:
-                return True
+    # Very short queries (1-4 words) that are greetings and mention no legal term
+    if len(q.split()) <= 4 and _GREETING_RE.search(q) and not _LEGAL_KEYWORD_RE.search(q):
+        return True
     
     # Pure math expressions: "5+7", "what is 2*3", etc.
-    import re
     # Remove common question starters
-    cleaned = re.sub(r'^(what\s+is|calculate|solve|whats|what\'s)\s*', '', q)
-    if re.match(r'^[\d\s+\-*/().^%=]+$', cleaned.strip()) and len(cleaned.strip()) > 0:
+    cleaned = _MATH_PREFIX_RE.sub('', q).strip()
+    if cleaned and _MATH_EXPR_RE.match(cleaned):
         return True
     
     return False
 
-RAG_SYSTEM_PROMPT = """You are PakLawChatBot, a knowledgeable Pakistani legal assistant with access to legal documents and statutes.
-
-RESPONSE STYLE:
-- Start with a clear, direct answer to the question (2-3 sentences summarizing the key point)
-- Then provide a detailed explanation using the context from the legal documents provided
-- DO NOT say "the documents don't contain", "based on the provided context", or "according to the documents"
-- Just answer naturally as if you already know the law — the context is your knowledge
-- Use **bold** for important legal terms, article numbers, and section references
-- Use numbered lists when explaining multiple points:
-  1. **Legal Term / Article / Right** — Clear explanation of what it means and how it applies
-  2. **Next Point** — Continue with relevant details
-- Include the specific law name, act, section, or article number whenever the context provides it
-- Explain legal concepts in plain language so a non-lawyer can understand
-- If the law mentions penalties, punishments, procedures, or time limits — include them
-- Structure longer responses with clear flow: What is it → How it works → What it means for you
-
-OUT-OF-DOMAIN / UNKNOWN TOPICS HANDLING:
-- If the user asks about a topic completely unrelated to law (e.g., specific cars like Bugatti, cooking, celebrities, random words) AND there is no information in the context:
-- DO NOT try to connect it to Pakistani law, fundamental rights, or the penal code.
-- Simply respond EXACTLY like this: "I have no knowledge about [Topic] and your question is irrelevant to Pakistani Law."
-- Conclude your answer immediately without providing any further explanation or bullet points.
-
-IMPORTANT:
-- Cite specific sections and articles from the context (e.g., "Under **Section 379 of the Pakistan Penal Code**...")
-- If the question involves rights, explain both the right AND any exceptions or conditions
-- If the question involves a procedure, explain the steps clearly
-- End with: "⚖️ *This is general legal information. Consult a qualified lawyer for advice specific to your situation.*"
-"""
 
 # Category metadata: user-facing name, topic scope, and suggested category key
 CATEGORY_INFO = {
@@ -143,12 +160,12 @@ CATEGORY_INFO = {
         "scope": "Pakistan Penal Code (PPC), Criminal Procedure Code (CrPC), offences, punishments, bail, FIR, arrests, trials",
         "off_topic_examples": "marriage, divorce, property transfer, cyber crimes, labour rights, constitutional rights"
     },
-    "Family": {
+    "family": {
         "name": "Family Laws",
         "scope": "Muslim Family Laws Ordinance (MFLO), marriage, nikah, divorce, talaq, khula, child custody, maintenance, inheritance, guardianship",
         "off_topic_examples": "criminal offences, property registration, cyber crimes, labour wages, constitutional petitions"
     },
-    "Property": {
+    "property": {
         "name": "Property & Land Laws",
         "scope": "Transfer of Property Act, land revenue, mutation, property registration, landlord-tenant, inheritance of property",
         "off_topic_examples": "criminal law, family courts, cyber crimes, employment rights, constitutional rights"
@@ -176,7 +193,7 @@ CATEGORY_INFO = {
 }
 
 
-def build_rag_system_prompt(category: str = None) -> str:
+def build_rag_system_prompt(category: Optional[str] = None) -> str:
     """
     Build a category-aware RAG system prompt.
     Injects the active category's scope so the model can:
@@ -216,8 +233,12 @@ Answer all questions thoroughly — this is the general category and covers all
     else:
         category_block = ""
 
+    # The shared instructions come first and the category block last, so every
+    # category's prompt starts with the same long prefix. Providers that do
+    # automatic prompt (prefix) caching, such as Groq, can then reuse the cached
+    # prefill across all categories instead of diverging after the first line.
     return f"""You are PakLawChatBot, a knowledgeable Pakistani legal assistant with access to legal documents and statutes.
-{category_block}
+
 RESPONSE STYLE:
 - Start with a clear, direct answer to the question (2-3 sentences summarizing the key point)
 - Then provide a detailed explanation using the context from the legal documents provided
@@ -251,52 +272,241 @@ IMPORTANT:
 - If the question involves rights, explain both the right AND any exceptions or conditions
 - If the question involves a procedure, explain the steps clearly
 - End with: "⚖️ *This is general legal information. Consult a qualified lawyer for advice specific to your situation.*"
-"""
+{category_block}"""
+
+# Prebuilt system messages — the prompts are static (RAG prompt varies only
+# by category), so build each SystemMessage once instead of per request
+_BASIC_SYSTEM_MESSAGE = SystemMessage(content=BASIC_SYSTEM_PROMPT)
+_OFF_TOPIC_SYSTEM_MESSAGE = SystemMessage(content=OFF_TOPIC_SYSTEM_PROMPT)
+_RAG_SYSTEM_MESSAGES = {
+    category: SystemMessage(content=build_rag_system_prompt(category))
+    for category in [None, *CATEGORY_INFO]
+}
+
+
+def _get_rag_system_message(category: Optional[str]) -> SystemMessage:
+    """Return the prebuilt category-aware RAG system message"""
+    return _RAG_SYSTEM_MESSAGES.get(category, _RAG_SYSTEM_MESSAGES[None])
+
 
 # Global instances (loaded once)
-_vector_store_manager = None
-_hybrid_retriever = None
+_vector_store_manager: Optional["VectorStoreManager"] = None
+_hybrid_retriever: Optional["HybridRetriever"] = None
+
+# Semantic response cache: near-duplicate questions (cosine >= threshold)
+# skip retrieval and the LLM call entirely
+_response_cache = SemanticCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", "1000")),
+    ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+)
+
+# Shared pooled HTTP/2 client for all Groq calls: concurrent requests
+# multiplex over kept-alive connections instead of new TCP+TLS handshakes.
+# HTTP/2 needs the h2 package (httpx[http2]); without it fall back to
+# pooled HTTP/1.1 rather than failing at import
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+    logger.warning("h2 not installed (pip install 'httpx[http2]'); Groq calls will use HTTP/1.1")
+
+_http_client = httpx.Client(
+    http2=_HTTP2_AVAILABLE,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=128, keepalive_expiry=60.0),
+    timeout=30.0
+)
+
+GROQ_BASE_URL = "https://api.groq.com"
+
+# Background pool for connection pre-warming (runs alongside retrieval)
+_prewarm_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-prewarm")
+_last_groq_activity = 0.0
+
+
+def _prewarm_llm_connection():
+    """Open (or refresh) the pooled connection to Groq so the TLS handshake
+    happens while retrieval runs, not after it"""
+    global _last_groq_activity
+    try:
+        _http_client.head(GROQ_BASE_URL, timeout=5.0)
+        _last_groq_activity = time.time()
+    except Exception as e:
+        logger.warning("LLM connection prewarm failed (non-critical): %s", e)
+
+
+def _maybe_prewarm_llm_connection():
+    """Fire a prewarm at most once per keep-alive window (60s) so idle gaps
+    never leave the first LLM call paying a fresh handshake"""
+    if time.time() - _last_groq_activity > 50.0:
+        _prewarm_pool.submit(_prewarm_llm_connection)
 
 # Cached LLM clients (reused across requests to avoid connection setup overhead)
-_llm_primary = None
-_llm_fallback = None
+_llm_primary: Optional["ChatGroq"] = None
+_llm_fallback: Optional["ChatGroq"] = None
+_llm_off_topic: Optional["ChatGroq"] = None
+# Guards lazy construction — requests run in worker threads, so two first
+# requests could otherwise race and build duplicate clients
+_llm_lock = threading.Lock()
 
 
-def _get_llm_primary():
+def _get_llm_primary() -> Optional["ChatGroq"]:
     """Get or create cached primary LLM client"""
     global _llm_primary
-    if _llm_primary is None and groq_api_key:
-        _llm_primary = ChatGroq(
-            model=primary_model,
-            groq_api_key=groq_api_key,
-            temperature=0.7
-        )
-        print(f"[OK] Primary LLM client cached: {primary_model}")
+    if _llm_primary is not None or not groq_api_key:
+        return _llm_primary
+    with _llm_lock:
+        if _llm_primary is None:
+            from langchain_groq import ChatGroq
+            _llm_primary = ChatGroq(
+                model=primary_model,
+                groq_api_key=groq_api_key,
+                http_client=_http_client,
+                temperature=0.7
+            )
+            logger.info("Primary LLM client cached: %s", primary_model)
     return _llm_primary
 
 
-def _get_llm_fallback():
+def _get_llm_fallback() -> Optional["ChatGroq"]:
     """Get or create cached fallback LLM client"""
     global _llm_fallback
-    if _llm_fallback is None and groq_api_key:
-        _llm_fallback = ChatGroq(
-            model=fallback_model,
-            groq_api_key=groq_api_key,
-            temperature=0.7
-        )
-        print(f"[OK] Fallback LLM client cached: {fallback_model}")
+    if _llm_fallback is not None or not groq_api_key:
+        return _llm_fallback
+    with _llm_lock:
+        if _llm_fallback is None:
+            from langchain_groq import ChatGroq
+            _llm_fallback = ChatGroq(
+                model=fallback_model,
+                groq_api_key=groq_api_key,
+                http_client=_http_client,
+                temperature=0.7
+            )
+            logger.info("Fallback LLM client cached: %s", fallback_model)
     return _llm_fallback
 
 
-def load_vector_store():
+def _get_llm_off_topic() -> Optional["ChatGroq"]:
+    """Get or create cached LLM client for short off-topic replies"""
+    global _llm_off_topic
+    if _llm_off_topic is not None or not groq_api_key:
+        return _llm_off_topic
+    with _llm_lock:
+        if _llm_off_topic is None:
+            from langchain_groq import ChatGroq
+            _llm_off_topic = ChatGroq(
+                model=primary_model,
+                groq_api_key=groq_api_key,
+                http_client=_http_client,
+                temperature=0.5,
+                max_tokens=200
+            )
+            logger.info("Off-topic LLM client cached: %s", primary_model)
+    return _llm_off_topic
+
+
+# Auth failures hit every model on the same key, so falling back can't help.
+# 400s still fall back: Groq reports decommissioned models and per-model
+# context-length overflows as 400.
+_NON_RETRIABLE_STATUS = frozenset({401, 403})
+
+
+class AllModelsFailedError(Exception):
+    """Raised by FallbackChat when every model in the chain failed"""
+
+    def __init__(self, errors: List[Tuple[str, Exception]]):
+        self.errors = errors
+        super().__init__("\n".join(f"{role}: {e}" for role, e in errors))
+
+
+class FallbackChat:
+    """Try an ordered list of cached LLM clients, moving on when one fails"""
+
+    def __init__(self, models: List[Tuple[str, str, Callable[[], Optional["ChatGroq"]]]]):
+        """
+        Initialize fallback chain
+
+        Args:
+            models: (role, model name, client getter) tuples in priority order
+        """
+        self.models = models
+
+    @staticmethod
+    def _is_retriable(error: Exception) -> bool:
+        return getattr(error, "status_code", None) not in _NON_RETRIABLE_STATUS
+
+    def invoke(self, messages: List[BaseMessage]) -> Tuple[BaseMessage, str]:
+        """
+        Invoke the first model that answers
+
+        Returns:
+            (response message, role of the model that produced it)
+
+        Raises:
+            AllModelsFailedError: if no model answered
+        """
+        errors: List[Tuple[str, Exception]] = []
+        for role, model, get_client in self.models:
+            start = time.time()
+            try:
+                response = get_client().invoke(messages)
+                logger.debug("[TIMING] LLM %s (%s): %.2fs", role, model, time.time() - start)
+                return response, role
+            except Exception as e:
+                logger.warning("%s model (%s) failed (%.2fs): %s", role, model, time.time() - start, e)
+                errors.append((role, e))
+                if not self._is_retriable(e):
+                    break
+        raise AllModelsFailedError(errors)
+
+    def stream(self, messages: List[BaseMessage]) -> Iterator[str]:
+        """
+        Stream content chunks from the first model that answers.
+        Falls back only before the first chunk — once text has been yielded
+        the answer can't be restarted on another model.
+
+        Raises:
+            AllModelsFailedError: if no model produced any output
+        """
+        errors: List[Tuple[str, Exception]] = []
+        for role, model, get_client in self.models:
+            start = time.time()
+            streamed = False
+            try:
+                for chunk in get_client().stream(messages):
+                    if chunk.content:
+                        streamed = True
+                        yield chunk.content
+                logger.debug("[TIMING] LLM stream %s (%s): %.2fs", role, model, time.time() - start)
+                return
+            except Exception as e:
+                logger.warning("%s model (%s) stream failed (%.2fs): %s", role, model, time.time() - start, e)
+                if streamed:
+                    raise
+                errors.append((role, e))
+                if not self._is_retriable(e):
+                    break
+        raise AllModelsFailedError(errors)
+
+
+_chat = FallbackChat([
+    ("Primary", primary_model, _get_llm_primary),
+    ("Fallback", fallback_model, _get_llm_fallback),
+])
+
+
+def load_vector_store() -> Optional["VectorStoreManager"]:
     """Load vector store (singleton pattern)"""
     global _vector_store_manager
     
     if _vector_store_manager is not None:
         return _vector_store_manager
     
-    if not RAG_AVAILABLE:
+    vector_store_module = _import_rag_components().get("vector_store")
+    if vector_store_module is None:
         return None
+    VectorStoreManager = vector_store_module.VectorStoreManager
     
     try:
         # Try to load FULL vector store first (priority)
@@ -307,7 +517,7 @@ def load_vector_store():
         
         if manager.load_vectorstore() is not None:
             _vector_store_manager = manager
-            print("✓ RAG enabled: Loaded full vector store (PakLaw Docs)")
+            logger.info("RAG enabled: Loaded full vector store (PakLaw Docs)")
             return _vector_store_manager
         
         # Fall back to test vector store if full doesn't exist
@@ -318,62 +528,200 @@ def load_vector_store():
         
         if manager.load_vectorstore() is not None:
             _vector_store_manager = manager
-            print("✓ RAG enabled: Loaded test vector store (Pakistan Constitution)")
+            logger.info("RAG enabled: Loaded test vector store (Pakistan Constitution)")
             return _vector_store_manager
         
-        print("⚠️ No vector store found. Run ingestion first. Using basic mode.")
+        logger.warning("No vector store found. Run ingestion first. Using basic mode.")
         return None
         
     except Exception as e:
-        print(f"⚠️ Error loading vector store: {str(e)}. Using basic mode.")
+        logger.error("Error loading vector store: %s. Using basic mode.", e)
         return None
 
 
-def get_hybrid_retriever():
+def _bm25_cache_key(vector_store: "VectorStoreManager") -> str:
+    """
+    Identifies the collection state a saved BM25 index was built from.
+    The chunk count alone misses metadata updates (duplicate_sources) and
+    one-for-one chunk replacements, so the Chroma SQLite files' mtime and
+    size are part of the key — any write to the store invalidates it.
+    """
+    parts = [vector_store.collection_name, str(vector_store.vectorstore._collection.count())]
+    db_path = os.path.join(vector_store.persist_directory, "chroma.sqlite3")
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        parts.append(f"{st.st_mtime_ns}-{st.st_size}")
+    return ":".join(parts)
+
+
+def get_hybrid_retriever() -> Optional["HybridRetriever"]:
     """Get or create hybrid retriever (singleton pattern)"""
     global _hybrid_retriever
     
-    if not HYBRID_AVAILABLE:
-        return None
-    
     if _hybrid_retriever is not None:
         return _hybrid_retriever
     
+    retriever_module = _import_rag_components().get("retriever")
+    if retriever_module is None:
+        return None
+    HybridRetriever = retriever_module.HybridRetriever
+    
     vector_store = load_vector_store()
     if vector_store is None or vector_store.vectorstore is None:
         return None
     
     try:
-        # Extract documents from vectorstore for BM25 indexing
-        documents = build_bm25_from_vectorstore(vector_store.vectorstore)
+        # Reuse the BM25 index saved next to the vector store if it was built
+        # from the same collection state; otherwise rebuild and save it
+        bm25_path = os.path.join(vector_store.persist_directory, "bm25.pkl")
+        cache_key = _bm25_cache_key(vector_store)
+        prebuilt = retriever_module.load_bm25_index(bm25_path, cache_key)
         
-        # Create hybrid retriever
-        _hybrid_retriever = HybridRetriever(
-            vectorstore=vector_store.vectorstore,
-            documents=documents
-        )
-        print("✓ Hybrid retriever initialized (Semantic + BM25)")
+        if prebuilt is not None:
+            _hybrid_retriever = HybridRetriever(
+                vectorstore=vector_store.vectorstore,
+                prebuilt_bm25=prebuilt
+            )
+        else:
+            # Extract documents from vectorstore for BM25 indexing
+            documents = retriever_module.build_bm25_from_vectorstore(vector_store.vectorstore)
+            
+            # Create hybrid retriever
+            _hybrid_retriever = HybridRetriever(
+                vectorstore=vector_store.vectorstore,
+                documents=documents
+            )
+            try:
+                _hybrid_retriever.save_bm25_index(bm25_path, cache_key)
+            except Exception as e:
+                logger.warning("Could not save BM25 index (non-critical): %s", e)
+        
+        logger.info("Hybrid retriever initialized (Semantic + BM25)")
         return _hybrid_retriever
         
     except Exception as e:
-        print(f"⚠️ Could not initialize hybrid retriever: {e}")
+        logger.warning("Could not initialize hybrid retriever: %s", e)
         return None
 
 
-def get_rag_response(user_input: str, k: int = 5, category_filter: dict = None, category: str = None) -> Dict[str, any]:
+# In-flight RAG requests, keyed by normalized question + filter.
+# Concurrent identical questions share one retrieval + LLM call.
+_inflight_lock = threading.Lock()
+_inflight: Dict[tuple, Future] = {}
+
+# Exact-match LRU of answered questions (double submits, retries, FAQs).
+# Checked before the semantic cache — a hit costs no embedding at all.
+_exact_cache = LRUCache(maxsize=512)
+# Same for non-RAG (basic mode) answers, keyed by normalized question
+_basic_cache = LRUCache(maxsize=512)
+
+
+def _rag_cache_key(user_input: str, k: int, category_filter: Optional[dict], category: Optional[str]) -> tuple:
+    """Normalized, hashable key for a RAG request"""
+    filter_key = frozenset(category_filter.items()) if category_filter else None
+    return (normalize_query(user_input), filter_key, category, k)
+
+
+def _semantic_cache_namespace(category_filter: Optional[dict], category: Optional[str], k: int) -> str:
+    """Semantic cache partition — answers never leak across filters/categories"""
+    return f"{category_filter}|{category}|{k}"
+
+
+def _semantic_cache_lookup(vector_store, user_input: str, namespace: str) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]]]:
+    """
+    Look up a near-duplicate question in the semantic response cache
+
+    Returns:
+        (cached result or None, query embedding for a later add — None if embedding failed)
+    """
+    try:
+        query_embedding = vector_store.embeddings.embed_query(user_input)
+        cached = _response_cache.lookup(query_embedding, namespace)
+        if cached is not None:
+            logger.debug("[CACHE] Semantic cache hit (%d hits / %d misses)", _response_cache.hits, _response_cache.misses)
+        return cached, query_embedding
+    except Exception as e:
+        logger.warning("Semantic cache lookup failed: %s", e)
+        return None, None
+
+
+def _join_inflight(key: tuple) -> Tuple[Future, bool]:
+    """Return the in-flight future for key and whether the caller leads (must compute it)"""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future, False
+        future = Future()
+        _inflight[key] = future
+        return future, True
+
+
+def _leave_inflight(key: tuple):
+    with _inflight_lock:
+        _inflight.pop(key, None)
+
+
+def clear_response_caches():
+    """Drop all cached answers (call after the vector store is rebuilt)"""
+    _exact_cache.clear()
+    _basic_cache.clear()
+    _response_cache.clear()
+    if _hybrid_retriever is not None:
+        _hybrid_retriever.clear_cache()
+
+
+def get_rag_response(user_input: str, k: int = 5, category_filter: Optional[dict] = None, category: Optional[str] = None) -> Dict[str, Any]:
     """
     Generate response using RAG (Retrieval Augmented Generation)
-    Uses Hybrid Search + Reranking if available
+    Uses Hybrid Search + Reranking if available.
+    Identical questions arriving while one is already being answered
+    wait for that answer instead of issuing their own LLM call.
 
     Args:
         user_input: User's question
         k: Number of document chunks to retrieve
         category_filter: Optional dict for filtering by category (e.g., {"department": "Criminal_Laws"})
-        category: The UI category key (e.g., "criminal", "Family") for category-aware prompting
+        category: The UI category key (e.g., "criminal", "family") for category-aware prompting
 
     Returns:
         Dict with 'response', 'sources', and 'context_used'
     """
+    key = _rag_cache_key(user_input, k, category_filter, category)
+    
+    cached = _exact_cache.get(key)
+    if cached is not None:
+        logger.debug("[CACHE] Exact-match cache hit")
+        return cached
+    
+    future, is_leader = _join_inflight(key)
+    if not is_leader:
+        logger.debug("[BATCH] Joined in-flight request for identical question")
+        try:
+            return future.result()
+        except Exception as e:
+            # The leader failed or its stream was closed early — answer independently
+            logger.debug("[BATCH] In-flight leader failed (%s), answering independently", e)
+            return _compute_rag_response(user_input, k, category_filter, category)
+    
+    try:
+        result = _compute_rag_response(user_input, k, category_filter, category)
+        future.set_result(result)
+        # Only cache real answers, not transient errors or "no context" replies
+        if result.get("context_used"):
+            _exact_cache.put(key, result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        _leave_inflight(key)
+
+
+def _compute_rag_response(user_input: str, k: int = 5, category_filter: Optional[dict] = None, category: Optional[str] = None) -> Dict[str, Any]:
+    """Run the full RAG pipeline for one question (see get_rag_response)"""
     if not groq_api_key:
         return {
             "response": "⚠️ GROQ_API_KEY is missing. Please set it in your .env file.",
@@ -384,23 +732,17 @@ def get_rag_response(user_input: str, k: int = 5, category_filter: dict = None,
     # 1. Check for off-topic queries — skip expensive RAG retrieval
     if is_off_topic(user_input):
         try:
-            client = _get_groq_client()
-            off_topic_response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": OFF_TOPIC_SYSTEM_PROMPT},
-                    {"role": "user", "content": user_input}
-                ],
-                temperature=0.5,
-                max_tokens=200,
-            )
+            off_topic_response = _get_llm_off_topic().invoke([
+                _OFF_TOPIC_SYSTEM_MESSAGE,
+                HumanMessage.model_construct(content=user_input)
+            ])
             return {
-                "response": off_topic_response.choices[0].message.content,
+                "response": off_topic_response.content,
                 "sources": [],
                 "context_used": False
             }
         except Exception as e:
-            print(f"[WARN] Off-topic LLM call failed: {e}")
+            logger.warning("Off-topic LLM call failed: %s", e)
             return {
                 "response": "Hello! I'm PakLawChatBot, your Pakistani legal assistant. How can I help you with legal matters today? ⚖️",
                 "sources": [],
@@ -417,119 +759,46 @@ def get_rag_response(user_input: str, k: int = 5, category_filter: dict = None,
             "context_used": False
         }
     
+    cache_namespace = _semantic_cache_namespace(category_filter, category, k)
+    cached, query_embedding = _semantic_cache_lookup(vector_store, user_input, cache_namespace)
+    if cached is not None:
+        return cached
+    
     try:
         total_start = time.time()
         
-        # ── Step 1: Retrieval ──
-        retrieval_start = time.time()
-        retriever = get_hybrid_retriever()
-        
-        if retriever is not None:
-            # Hybrid search with reranking and optional category filter
-            retrieved_docs = retriever.search(
-                query=user_input,
-                k=k,
-                use_hybrid=True,
-                use_rerank=True,
-                filter_dict=category_filter
-            )
-        else:
-            # Fallback to basic semantic search with filter
-            retrieved_docs = vector_store.search(user_input, k=k, filter_dict=category_filter)
-        
-        retrieval_time = time.time() - retrieval_start
-        print(f"[TIMING] Retrieval: {retrieval_time:.2f}s ({len(retrieved_docs) if retrieved_docs else 0} docs)")
-        
-        if not retrieved_docs:
+        # ── Step 1 + 2: Retrieval and Context Building ──
+        prepared = _prepare_rag_messages(user_input, k, category_filter, category)
+        if prepared is None:
             return {
-                "response": "I couldn't find relevant information in the legal documents for your query. Please try rephrasing your question or ask about a specific law, article, or legal topic.",
+                "response": NO_CONTEXT_RESPONSE,
                 "sources": [],
                 "context_used": False
             }
-        
-        # ── Step 2: Context Building ──
-        context_start = time.time()
-        context_parts = []
-        sources = []
-        
-        for i, doc in enumerate(retrieved_docs, 1):
-            source_name = doc.metadata.get('source', 'Unknown')
-            page_num = doc.metadata.get('page', 'N/A')
-            
-            context_parts.append(
-                f"[Document {i}: {source_name}, Page {page_num}]\n{doc.page_content}\n"
-            )
-            
-            sources.append({
-                "source": source_name,
-                "page": page_num,
-                "preview": doc.page_content[:150] + "..."
-            })
-        
-        context = "\n---\n".join(context_parts)
-        context_time = time.time() - context_start
-        print(f"[TIMING] Context build: {context_time:.3f}s ({len(context)} chars)")
-        
-        # Create enhanced prompt with context
-        enhanced_prompt = f"""Context from Pakistani legal documents:
-
-{context}
-
----
-
-User Question: {user_input}
-
-Answer the question using the context above. Cite specific legal sections and articles by name (e.g., "Article 25", "Section 302 PPC"). Do NOT reference document numbers, file names, or page numbers in your answer."""
+        messages, sources = prepared
         
         # ── Step 3: LLM Generation ──
-        # Build category-aware system prompt so the model knows its scope
-        system_prompt = build_rag_system_prompt(category)
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=enhanced_prompt)
-        ]
-        
-        llm_start = time.time()
         try:
-            chat_primary = _get_llm_primary()
-            response = chat_primary.invoke(messages)
-            llm_time = time.time() - llm_start
-            total_time = time.time() - total_start
-            print(f"[TIMING] LLM ({primary_model}): {llm_time:.2f}s")
-            print(f"[TIMING] ── TOTAL: {total_time:.2f}s (retrieval={retrieval_time:.2f}s + context={context_time:.3f}s + llm={llm_time:.2f}s)")
-            
+            response, _ = _chat.invoke(messages)
+        except AllModelsFailedError as e:
             return {
-                "response": response.content,
-                "sources": sources,
-                "context_used": True
+                "response": f"⚠️ Both models failed.\n{e}",
+                "sources": [],
+                "context_used": False
             }
-            
-        except Exception as e1:
-            print(f"Primary model failed ({time.time() - llm_start:.2f}s): {str(e1)}")
-            try:
-                llm_fallback_start = time.time()
-                chat_fallback = _get_llm_fallback()
-                response = chat_fallback.invoke(messages)
-                llm_time = time.time() - llm_fallback_start
-                total_time = time.time() - total_start
-                print(f"[TIMING] LLM Fallback ({fallback_model}): {llm_time:.2f}s")
-                print(f"[TIMING] ── TOTAL (fallback): {total_time:.2f}s")
-                
-                return {
-                    "response": response.content,
-                    "sources": sources,
-                    "context_used": True
-                }
-                
-            except Exception as e2:
-                return {
-                    "response": f"⚠️ Both models failed.\nPrimary: {str(e1)}\nFallback: {str(e2)}",
-                    "sources": [],
-                    "context_used": False
-                }
+        logger.debug("[TIMING] ── TOTAL: %.2fs", time.time() - total_start)
+        
+        result = {
+            "response": response.content,
+            "sources": sources,
+            "context_used": True
+        }
+        if query_embedding is not None:
+            _response_cache.add(query_embedding, result, cache_namespace)
+        return result
         
     except Exception as e:
-        print(f"RAG error: {str(e)}. Falling back to basic mode.")
+        logger.error("RAG error: %s. Falling back to basic mode.", e)
         return {
             "response": get_basic_response(user_input),
             "sources": [],
@@ -537,43 +806,264 @@ Answer the question using the context above. Cite specific legal sections and ar
         }
 
 
+NO_CONTEXT_RESPONSE = "I couldn't find relevant information in the legal documents for your query. Please try rephrasing your question or ask about a specific law, article, or legal topic."
+
+
+# Upper bound on retrieved context sent to the LLM (characters)
+MAX_CONTEXT_CHARS = 6000
+
+# Fixed pieces of the RAG user prompt, joined around the per-request context
+_CONTEXT_SEPARATOR = "\n---\n"
+_CONTEXT_PROMPT_HEAD = "Context from Pakistani legal documents:\n\n"
+_CONTEXT_PROMPT_QUESTION = "\n\n---\n\nUser Question: "
+_CONTEXT_PROMPT_TAIL = (
+    "\n\nAnswer the question using the context above. Cite specific legal sections and articles "
+    "by name (e.g., \"Article 25\", \"Section 302 PPC\"). Do NOT reference document numbers, "
+    "file names, or page numbers in your answer."
+)
+
+
+def _prepare_rag_messages(
+    user_input: str, k: int, category_filter: Optional[dict] = None, category: Optional[str] = None
+) -> Optional[Tuple[List[BaseMessage], List[Dict[str, Any]]]]:
+    """
+    Retrieve relevant chunks and build the LLM messages for a RAG answer.
+    Shared by get_rag_response and stream_rag_response.
+
+    Returns:
+        (messages, sources) tuple, or None if nothing relevant was retrieved
+    """
+    vector_store = load_vector_store()
+    
+    # Warm the Groq connection in parallel with retrieval
+    _maybe_prewarm_llm_connection()
+    
+    # ── Step 1: Retrieval ──
+    retrieval_start = time.time()
+    retriever = get_hybrid_retriever()
+    
+    if retriever is not None:
+        # Hybrid search with reranking and optional category filter
+        retrieved_docs = retriever.search(
+            query=user_input,
+            k=k,
+            use_hybrid=True,
+            use_rerank=True,
+            filter_dict=category_filter
+        )
+    else:
+        # Fallback to basic semantic search with filter
+        retrieved_docs = vector_store.search(user_input, k=k, filter_dict=category_filter)
+    
+    retrieval_time = time.time() - retrieval_start
+    logger.debug("[TIMING] Retrieval: %.2fs (%d docs)", retrieval_time, len(retrieved_docs) if retrieved_docs else 0)
+    
+    if not retrieved_docs:
+        return None
+    
+    # Drop repeats of the same chunk (semantic and BM25 often surface the same
+    # one) so duplicate text never reaches the prompt
+    seen = set()
+    unique_docs = []
+    for doc in retrieved_docs:
+        key = (doc.metadata.get('source'), doc.metadata.get('page'), doc.page_content[:256])
+        if key not in seen:
+            seen.add(key)
+            unique_docs.append(doc)
+    retrieved_docs = unique_docs
+    
+    # ── Step 2: Context Building ──
+    # Chunks are added in rank order until MAX_CONTEXT_CHARS is reached (the
+    # last one is truncated), bounding prompt tokens and LLM prefill time
+    context_start = time.time()
+    context_parts = []
+    sources = []
+    used = 0
+    
+    for i, doc in enumerate(retrieved_docs, 1):
+        remaining = MAX_CONTEXT_CHARS - used
+        if remaining <= 0:
+            break
+        
+        source_name = doc.metadata.get('source', 'Unknown')
+        page_num = doc.metadata.get('page', 'N/A')
+        # Same text found in other laws/pages (dropped as duplicates at ingest)
+        also_in = doc.metadata.get('duplicate_sources')
+        
+        label = f"{source_name}, Page {page_num}; also in: {also_in}" if also_in else f"{source_name}, Page {page_num}"
+        part = f"[Document {i}: {label}]\n{doc.page_content}\n"
+        if len(part) > remaining:
+            part = part[:remaining]
+        context_parts.append(part)
+        used += len(part) + len(_CONTEXT_SEPARATOR)
+        
+        source = {
+            "source": source_name,
+            "page": page_num,
+            "preview": doc.page_content[:150] + "..."
+        }
+        if also_in:
+            source["duplicate_sources"] = also_in.split("; ")
+        sources.append(source)
+    
+    context = _CONTEXT_SEPARATOR.join(context_parts)
+    context_time = time.time() - context_start
+    logger.debug("[TIMING] Context build: %.3fs (%d chars, %d/%d docs)", context_time, len(context), len(context_parts), len(retrieved_docs))
+    
+    # Create enhanced prompt with context
+    enhanced_prompt = "".join((_CONTEXT_PROMPT_HEAD, context, _CONTEXT_PROMPT_QUESTION, user_input, _CONTEXT_PROMPT_TAIL))
+    
+    # Category-aware system prompt so the model knows its scope
+    messages = [
+        _get_rag_system_message(category),
+        HumanMessage.model_construct(content=enhanced_prompt)
+    ]
+    return messages, sources
+
+
+def _result_events(result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Replay a complete RAG result as stream events (without the closing "done")"""
+    yield {"type": "sources", "sources": result["sources"], "context_used": result["context_used"]}
+    yield {"type": "token", "content": result["response"]}
+
+
+def stream_rag_response(user_input: str, k: int = 5, category_filter: Optional[dict] = None, category: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of get_rag_response.
+    Yields events so the client sees the first token as soon as it is decoded:
+        {"type": "sources", "sources": [...], "context_used": bool}
+        {"type": "token", "content": "..."}   (repeated)
+        {"type": "done"}
+    Off-topic queries, missing-store cases and cache hits are answered in a
+    single token event. Uses the same exact-match / semantic caches and
+    in-flight coalescing as get_rag_response: an identical question already
+    being answered (streamed or not) is waited for and replayed, trading
+    token-by-token delivery for a skipped LLM call.
+    """
+    if not groq_api_key or is_off_topic(user_input) or load_vector_store() is None:
+        yield from _result_events(
+            get_rag_response(user_input, k=k, category_filter=category_filter, category=category)
+        )
+        yield {"type": "done"}
+        return
+    
+    key = _rag_cache_key(user_input, k, category_filter, category)
+    cached = _exact_cache.get(key)
+    if cached is not None:
+        logger.debug("[CACHE] Exact-match cache hit")
+        yield from _result_events(cached)
+        yield {"type": "done"}
+        return
+    
+    future, is_leader = _join_inflight(key)
+    if not is_leader:
+        logger.debug("[BATCH] Joined in-flight request for identical question")
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.debug("[BATCH] In-flight leader failed (%s), answering independently", e)
+            result = _compute_rag_response(user_input, k, category_filter, category)
+        yield from _result_events(result)
+        yield {"type": "done"}
+        return
+    
+    try:
+        result = yield from _stream_rag_events(user_input, k, category_filter, category)
+        future.set_result(result)
+        # Only cache real answers, not transient errors or "no context" replies
+        if result["context_used"]:
+            _exact_cache.put(key, result)
+    except BaseException as e:
+        # GeneratorExit (client disconnected) is not an error waiters should re-raise
+        future.set_exception(e if isinstance(e, Exception) else RuntimeError("answer stream closed early"))
+        raise
+    finally:
+        _leave_inflight(key)
+    
+    yield {"type": "done"}
+
+
+def _stream_rag_events(user_input: str, k: int, category_filter: Optional[dict], category: Optional[str]):
+    """
+    Stream one RAG answer (semantic cache, retrieval, LLM) as events, without
+    the closing "done". Returns the joined result dict once the stream ends.
+    """
+    vector_store = load_vector_store()
+    cache_namespace = _semantic_cache_namespace(category_filter, category, k)
+    cached, query_embedding = _semantic_cache_lookup(vector_store, user_input, cache_namespace)
+    if cached is not None:
+        yield from _result_events(cached)
+        return cached
+    
+    try:
+        prepared = _prepare_rag_messages(user_input, k, category_filter, category)
+    except Exception as e:
+        logger.error("RAG error: %s. Falling back to basic mode.", e)
+        result = {"response": get_basic_response(user_input), "sources": [], "context_used": False}
+        yield from _result_events(result)
+        return result
+    
+    if prepared is None:
+        result = {"response": NO_CONTEXT_RESPONSE, "sources": [], "context_used": False}
+        yield from _result_events(result)
+        return result
+    
+    messages, sources = prepared
+    yield {"type": "sources", "sources": sources, "context_used": True}
+    
+    parts: List[str] = []
+    completed = False
+    try:
+        for content in _chat.stream(messages):
+            parts.append(content)
+            yield {"type": "token", "content": content}
+        completed = True
+    except AllModelsFailedError as e:
+        parts = [f"⚠️ Both models failed.\n{e}"]
+        yield {"type": "token", "content": parts[0]}
+    except Exception:
+        # Tokens already reached the client — can't restart with the fallback model
+        parts.append("\n\n⚠️ The response was interrupted. Please try again.")
+        yield {"type": "token", "content": parts[-1]}
+    
+    result = {
+        "response": "".join(parts),
+        "sources": sources if completed else [],
+        "context_used": completed
+    }
+    if completed and query_embedding is not None:
+        _response_cache.add(query_embedding, result, cache_namespace)
+    return result
+
+
 def get_basic_response(user_input: str) -> str:
     """Generate basic response without RAG"""
     if not groq_api_key:
         return "⚠️ GROQ_API_KEY is missing. Please set it in your .env file."
     
+    cache_key = normalize_query(user_input)
+    cached = _basic_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     messages = [
-        SystemMessage(content=BASIC_SYSTEM_PROMPT),
-        HumanMessage(content=user_input)
+        _BASIC_SYSTEM_MESSAGE,
+        HumanMessage.model_construct(content=user_input)
     ]
 
     try:
-        chat_primary = ChatGroq(
-            model=primary_model,
-            groq_api_key=groq_api_key,
-            temperature=0.7
-        )
-        response = chat_primary.invoke(messages)
-        return response.content
-        
-    except Exception as e1:
-        print(f"Primary model ({primary_model}) failed: {str(e1)}")
-        try:
-            chat_fallback = ChatGroq(
-                model=fallback_model,
-                groq_api_key=groq_api_key,
-                temperature=0.7
-            )
-            response = chat_fallback.invoke(messages)
-            return f"✓ (via Fallback) {response.content}"
-            
-        except Exception as e2:
-            return f"⚠️ Both models failed.\nPrimary error: {str(e1)}\nFallback error: {str(e2)}"
+        response, role = _chat.invoke(messages)
+    except AllModelsFailedError as e:
+        return f"⚠️ Both models failed.\n{e}"
+    
+    answer = response.content if role == "Primary" else f"✓ (via Fallback) {response.content}"
+    _basic_cache.put(cache_key, answer)
+    return answer
 
 
 def get_chatbot_response(user_input: str, use_rag: bool = True) -> str:
     """Generate chatbot response (with or without RAG)"""
-    if use_rag and RAG_AVAILABLE:
+    if use_rag and rag_available():
         result = get_rag_response(user_input)
         return result["response"]
     else:
@@ -6,7 +6,25 @@ Usage: python check_vectorstore.py
 """
 
 import os
-from vector_store import VectorStoreManager
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Metadata rows fetched per page — keeps memory flat for large collections
+PAGE_SIZE = 2000
+
+# Category directories listed concurrently — scandir releases the GIL, so
+# per-directory latency overlaps on slow or network-mounted storage
+SCAN_WORKERS = 16
+
+
+def _count_pdfs(path: str) -> int:
+    """Count PDF files directly inside a directory"""
+    with os.scandir(path) as entries:
+        return sum(
+            1 for f in entries
+            if f.is_file() and f.name.lower().endswith('.pdf')
+        )
 
 
 def check():
@@ -14,8 +32,9 @@ def check():
     print("  VECTOR STORE HEALTH CHECK")
     print("=" * 65)
     
-    # 1. Load vector store
+    # 1. Load vector store (imported here — pulls in Chroma + torch)
     print("\n[*] Loading vector store...")
+    from vector_store import VectorStoreManager
     vs = VectorStoreManager(
         persist_directory="vectorstores/chroma_db_full",
         collection_name="paklaw_docs"
@@ -29,25 +48,32 @@ def check():
     total_chunks = collection.count()
     print(f"[OK] Total chunks in store: {total_chunks}")
     
-    # 2. Get chunks per category from vector store
+    # 2. Get chunks per category from vector store (paged scan)
     print("\n[*] Reading metadata from vector store...")
-    results = collection.get(include=["metadatas"])
+    counts = Counter()
+    offset = 0
+    while True:
+        batch = collection.get(include=["metadatas"], limit=PAGE_SIZE, offset=offset)
+        metas = batch["metadatas"]
+        if not metas:
+            break
+        counts.update(meta.get("department", "unknown") for meta in metas)
+        offset += PAGE_SIZE
     
-    store_counts = {}
-    for meta in results["metadatas"]:
-        dept = meta.get("department", "unknown")
-        store_counts[dept] = store_counts.get(dept, 0) + 1
+    store_counts = dict(counts)
     
     # 3. Count PDFs per category from source data
     data_dir = "../data/pakistan_code"
     source_counts = {}
     
     if os.path.exists(data_dir):
-        for category in sorted(os.listdir(data_dir)):
-            cat_path = os.path.join(data_dir, category)
-            if os.path.isdir(cat_path):
-                pdf_count = len([f for f in os.listdir(cat_path) if f.lower().endswith('.pdf')])
-                source_counts[category] = pdf_count
+        with os.scandir(data_dir) as entries:
+            categories = [entry for entry in entries if entry.is_dir()]
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+            source_counts = dict(zip(
+                (c.name for c in categories),
+                executor.map(_count_pdfs, (c.path for c in categories))
+            ))
     
     # 4. Show comparison
     all_categories = sorted(set(list(source_counts.keys()) + list(store_counts.keys())))
@@ -3,26 +3,212 @@ Document Processor for RAG Pipeline
 Handles PDF loading, text extraction, and chunking for vector storage
 """
 
+import hashlib
+import mmap
 import os
-from typing import List
-from langchain_community.document_loaders import PyPDFLoader
+import pickle
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import pypdfium2 as pdfium
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
 
+def default_load_workers() -> int:
+    """Worker count for parallel PDF loading (INGEST_N_THREADS overrides)"""
+    env = os.getenv("INGEST_N_THREADS")
+    if env:
+        return max(1, int(env))
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+# PDFs hinted to the kernel for read-ahead beyond the ones being parsed
+# (serial) or already submitted to the worker pool
+PREFETCH_AHEAD = 8
+
+# PDFs submitted to the process pool per worker at any one time. Bounds the
+# finished-but-unconsumed results held in the pool (and the work discarded
+# on error) instead of submitting the whole corpus up front
+SUBMIT_WINDOW_PER_WORKER = 2
+
+
+def prefetch_file(path: str):
+    """
+    Ask the kernel to start reading a file into the page cache in the
+    background (posix_fadvise WILLNEED), so the parser's later read hits
+    memory instead of waiting on disk. No-op where fadvise is unavailable.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def iter_pdfs(directory_path: str, recursive: bool = True) -> Iterator[str]:
+    """
+    Yield PDF paths under a directory, in os.walk order (a directory's files
+    before its subdirectories). Uses os.scandir directly so file/dir checks
+    come from the cached DirEntry type instead of extra stat calls.
+    """
+    subdirs = []
+    with os.scandir(directory_path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.name.lower().endswith('.pdf') and entry.is_file():
+                yield entry.path
+    
+    if recursive:
+        for subdir in subdirs:
+            yield from iter_pdfs(subdir)
+
+
+# Parsed pages are cached per PDF content hash so re-runs (e.g. after an
+# interrupted ingest) skip parsing PDFs they have already seen.
+# Set PDF_CACHE_DIR="" to disable.
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", ".pdf_cache")
+# Bump when extraction or page metadata changes so stale cached pages are not reused
+PDF_EXTRACTOR = "pdfium-v2"
+
+
+def file_sha256(path: str) -> str:
+    """
+    SHA-256 of a file's bytes. Uses hashlib.file_digest on 3.11+; before that
+    (the 3.10 conda env) the file is memory-mapped and hashed in one update, so
+    OpenSSL runs over a single buffer instead of a Python read loop.
+    """
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap cannot map an empty file
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+
+def _pdf_cache_path(pdf_path: str) -> Optional[str]:
+    """Cache file for a PDF: keyed by its SHA-256 and the extractor that parsed it"""
+    if not PDF_CACHE_DIR:
+        return None
+    digest = file_sha256(pdf_path)
+    return os.path.join(PDF_CACHE_DIR, f"{digest}-{PDF_EXTRACTOR}.pkl")
+
+
+def _read_pdf_cache(cache_path: str) -> Optional[List[Document]]:
+    try:
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[WARN] Ignoring unreadable PDF cache {cache_path}: {e}")
+        return None
+
+
+def _write_pdf_cache(cache_path: str, documents: List[Document]):
+    try:
+        os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+        # Per-process temp name + atomic rename — safe with parallel workers
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(documents, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"[WARN] Could not write PDF cache (non-critical): {e}")
+
+
+def extract_pages(pdf_path: str) -> List[Document]:
+    """
+    Extract one Document per page straight from PDFium, without going
+    through LangChain's loader (same text, minus its per-page wrapping)
+    """
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        documents = []
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+            documents.append(Document(page_content=text, metadata={'source': pdf_path, 'page': i}))
+        return documents
+    finally:
+        pdf.close()
+
+
+def load_pdf(pdf_path: str, verbose: bool = True) -> List[Document]:
+    """
+    Load a single PDF file (module-level so it pickles cheaply into worker processes)
+    
+    Args:
+        pdf_path: Path to PDF file
+        verbose: Print a line per loaded PDF (errors are always printed)
+        
+    Returns:
+        List of Document objects with metadata
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF not found: {pdf_path}")
+    
+    try:
+        cache_path = _pdf_cache_path(pdf_path)
+    except Exception as e:
+        # The cache is an optimization — extract the PDF without it
+        print(f"[WARN] PDF cache disabled for {pdf_path}: {e}")
+        cache_path = None
+    
+    try:
+        documents = _read_pdf_cache(cache_path) if cache_path else None
+        cached = documents is not None
+        
+        if not cached:
+            # PDFium (C++) extracts text several times faster than pure-Python pypdf
+            documents = extract_pages(pdf_path)
+        
+        # Only the filename is stored: every metadata key is serialized into
+        # Chroma per chunk, and nothing filters or displays the full path
+        source = os.path.basename(pdf_path)
+        for doc in documents:
+            doc.metadata['source'] = source
+        
+        if cache_path and not cached and documents:
+            _write_pdf_cache(cache_path, documents)
+        
+        if verbose:
+            origin = "cache" if cached else "PDF"
+            print(f"[OK] Loaded {len(documents)} pages from {os.path.basename(pdf_path)} ({origin})")
+        return documents
+        
+    except Exception as e:
+        print(f"[ERROR] loading {pdf_path}: {str(e)}")
+        return []
+
+
 class DocumentProcessor:
     """Process PDF documents for RAG pipeline"""
     
-    def __init__(self, chunk_size: int = 1500, chunk_overlap: int = 300):
+    def __init__(self, chunk_size: int = 1500, chunk_overlap: int = 300, verbose: bool = True):
         """
         Initialize document processor
         
         Args:
             chunk_size: Size of text chunks for splitting (1500 optimal for legal docs)
             chunk_overlap: Overlap between chunks to maintain context
+            verbose: Print per-PDF load/chunk lines (bulk ingest turns this off and shows a progress bar)
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.verbose = verbose
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
@@ -40,24 +226,90 @@ class DocumentProcessor:
         Returns:
             List of Document objects with metadata
         """
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"PDF not found: {pdf_path}")
+        return load_pdf(pdf_path, self.verbose)
+    
+    def load_pdfs(self, pdf_paths: Iterable[str], max_workers: Optional[int] = None) -> Iterator[Tuple[str, List[Document]]]:
+        """
+        Load many PDFs in parallel. PDFium is not thread-safe (pypdfium2
+        serializes calls across threads), so parallelism comes from a
+        process pool with one PDFium instance per worker
         
-        try:
-            loader = PyPDFLoader(pdf_path)
-            documents = loader.load()
-            
-            # Add source filename to metadata
-            for doc in documents:
-                doc.metadata['source'] = os.path.basename(pdf_path)
-                doc.metadata['full_path'] = pdf_path
-            
-            print(f"[OK] Loaded {len(documents)} pages from {os.path.basename(pdf_path)}")
-            return documents
+        Args:
+            pdf_paths: Paths to PDF files
+            max_workers: Worker processes (default: INGEST_N_THREADS or cpu_count - 1)
             
-        except Exception as e:
-            print(f"[ERROR] loading {pdf_path}: {str(e)}")
-            return []
+        Yields:
+            (pdf_path, documents) in completion order (input order when serial)
+        """
+        yield from self._map_pdfs(load_pdf, load_pdf, pdf_paths, max_workers)
+    
+    def _map_pdfs(
+        self,
+        serial_func: Callable[[str], list],
+        worker_func: Callable[[str], list],
+        pdf_paths: Iterable[str],
+        max_workers: Optional[int] = None,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+        arg_lists: tuple = ()
+    ) -> Iterator[Tuple[str, list]]:
+        """
+        Run a per-PDF function serially or on a process pool. arg_lists are
+        extra per-PDF argument lists, zipped with the paths.
+        The pool path keeps at most workers * SUBMIT_WINDOW_PER_WORKER PDFs
+        submitted and yields each as it finishes, so a slow consumer stalls the
+        workers instead of letting results pile up. Closing the generator early
+        (or an error) cancels the PDFs not yet started.
+        """
+        pdf_paths = list(pdf_paths)
+        workers = max_workers or default_load_workers()
+        
+        if workers <= 1 or len(pdf_paths) <= 1:
+            results = map(serial_func, pdf_paths, *arg_lists)
+            yield from self._with_prefetch(pdf_paths, results, PREFETCH_AHEAD)
+            return
+        
+        window = workers * SUBMIT_WINDOW_PER_WORKER
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+        running: Dict[Future, str] = {}
+        next_index = 0
+        # Read-ahead runs PREFETCH_AHEAD files past the submission window, so
+        # it advances only as fast as PDFs are submitted
+        for pdf_path in pdf_paths[:PREFETCH_AHEAD]:
+            prefetch_file(pdf_path)
+        try:
+            while running or next_index < len(pdf_paths):
+                while next_index < len(pdf_paths) and len(running) < window:
+                    pdf_path = pdf_paths[next_index]
+                    if next_index + PREFETCH_AHEAD < len(pdf_paths):
+                        prefetch_file(pdf_paths[next_index + PREFETCH_AHEAD])
+                    args = [arg_list[next_index] for arg_list in arg_lists]
+                    running[pool.submit(worker_func, pdf_path, *args)] = pdf_path
+                    next_index += 1
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield running.pop(future), future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    @staticmethod
+    def _with_prefetch(pdf_paths: List[str], results: Iterable[List[Document]], ahead: int) -> Iterator[Tuple[str, List[Document]]]:
+        """
+        Pair paths with lazily computed (serial) results while keeping the
+        next `ahead` files prefetched — each result is only computed when
+        consumed, so read-ahead never runs more than `ahead` files ahead
+        """
+        for pdf_path in pdf_paths[:ahead]:
+            prefetch_file(pdf_path)
+        for i, documents in enumerate(results):
+            if i + ahead < len(pdf_paths):
+                prefetch_file(pdf_paths[i + ahead])
+            yield pdf_paths[i], documents
+    
+    @staticmethod
+    def find_pdfs(directory_path: str, recursive: bool = True) -> List[str]:
+        """List PDF paths in a directory (optionally walking subdirectories)"""
+        return list(iter_pdfs(directory_path, recursive))
     
     def load_directory(self, directory_path: str, recursive: bool = True) -> List[Document]:
         """
@@ -70,28 +322,14 @@ class DocumentProcessor:
         Returns:
             List of all Document objects from all PDFs
         """
+        pdf_paths = self.find_pdfs(directory_path, recursive)
+        
         all_documents = []
         pdf_count = 0
-        
-        if recursive:
-            # Walk through all subdirectories
-            for root, dirs, files in os.walk(directory_path):
-                for file in files:
-                    if file.lower().endswith('.pdf'):
-                        pdf_path = os.path.join(root, file)
-                        docs = self.load_pdf(pdf_path)
-                        all_documents.extend(docs)
-                        if docs:
-                            pdf_count += 1
-        else:
-            # Only check immediate directory
-            for file in os.listdir(directory_path):
-                if file.lower().endswith('.pdf'):
-                    pdf_path = os.path.join(directory_path, file)
-                    docs = self.load_pdf(pdf_path)
-                    all_documents.extend(docs)
-                    if docs:
-                        pdf_count += 1
+        for _, docs in self.load_pdfs(pdf_paths):
+            all_documents.extend(docs)
+            if docs:
+                pdf_count += 1
         
         print(f"\n[OK] Total: Loaded {pdf_count} PDFs with {len(all_documents)} pages")
         return all_documents
@@ -106,33 +344,89 @@ class DocumentProcessor:
         Returns:
             List of chunked Document objects
         """
-        chunks = self.text_splitter.split_documents(documents)
+        # Contextual headers help the embedding model understand WHAT document
+        # the text is from. Every chunk of a page shares its header, so it is
+        # built once per page and carried through the split in metadata.
+        # Pages of one PDF share source/department, so that part is built once.
+        prefixes = {}
+        for doc in documents:
+            metadata = doc.metadata
+            key = (metadata.get('source', ''), metadata.get('department', ''))
+            parts = prefixes.get(key)
+            if parts is None:
+                parts = prefixes[key] = self._header_parts(*key)
+            metadata['_header'] = self._format_header(parts, metadata.get('page', ''))
+        
+        try:
+            chunks = self._split_documents(documents)
+        finally:
+            for doc in documents:
+                del doc.metadata['_header']
         
-        # Add contextual headers to each chunk
-        # This helps the embedding model understand WHAT document the text is from
         for chunk in chunks:
-            source = chunk.metadata.get('source', '')
-            page = chunk.metadata.get('page', '')
-            department = chunk.metadata.get('department', '')
-            
-            # Build a context header
-            header_parts = []
-            if department:
-                header_parts.append(f"Category: {department.replace('_', ' ')}")
-            if source:
-                # Clean up source name (remove .pdf extension)
-                clean_source = source.replace('.pdf', '').replace('.PDF', '')
-                header_parts.append(f"Law: {clean_source}")
-            if page != '':
-                header_parts.append(f"Page: {page}")
-            
-            if header_parts:
-                header = " | ".join(header_parts)
-                chunk.page_content = f"[{header}]\n{chunk.page_content}"
+            metadata = chunk.metadata
+            header = metadata.pop('_header')
+            # Digest of the text before the header, so boilerplate repeated
+            # across laws/pages can be recognised at ingest time. Case and
+            # whitespace are normalized first: the same clause extracted from
+            # differently laid-out PDFs mostly differs in line breaks/spacing.
+            normalized = " ".join(chunk.page_content.lower().split())
+            metadata['content_hash'] = hashlib.blake2b(
+                normalized.encode('utf-8'), digest_size=16
+            ).hexdigest()
+            if header:
+                chunk.page_content = header + chunk.page_content
         
-        print(f"[OK] Created {len(chunks)} chunks from {len(documents)} pages (with contextual headers)")
+        if self.verbose:
+            print(f"[OK] Created {len(chunks)} chunks from {len(documents)} pages (with contextual headers)")
+        return chunks
+    
+    def _split_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Split pages into chunks. A page that already fits in one chunk is
+        emitted as-is (stripped, exactly what the splitter would return)
+        instead of going through the splitter's Python separator/merge loop;
+        only longer pages are handed to RecursiveCharacterTextSplitter.
+        """
+        chunks = []
+        for doc in documents:
+            text = doc.page_content
+            if len(text) <= self.chunk_size:
+                text = text.strip()
+                if text:
+                    chunks.append(Document(page_content=text, metadata=dict(doc.metadata)))
+            else:
+                chunks.extend(self.text_splitter.split_documents([doc]))
         return chunks
     
+    @staticmethod
+    def _build_header(source: str, page, department: str) -> str:
+        """Build the "[Category: ... | Law: ... | Page: ...]" prefix for a chunk"""
+        return DocumentProcessor._format_header(
+            DocumentProcessor._header_parts(source, department), page
+        )
+    
+    @staticmethod
+    def _header_parts(source: str, department: str) -> List[str]:
+        """Header fields that are the same for every page of a PDF"""
+        header_parts = []
+        if department:
+            header_parts.append(f"Category: {department.replace('_', ' ')}")
+        if source:
+            # Clean up source name (remove .pdf extension)
+            clean_source = source.replace('.pdf', '').replace('.PDF', '')
+            header_parts.append(f"Law: {clean_source}")
+        return header_parts
+    
+    @staticmethod
+    def _format_header(header_parts: List[str], page) -> str:
+        if page != '':
+            header_parts = header_parts + [f"Page: {page}"]
+        
+        if not header_parts:
+            return ""
+        return "[" + " | ".join(header_parts) + "]\n"
+    
     def process_pdf(self, pdf_path: str) -> List[Document]:
         """
         Complete pipeline: Load PDF and chunk it
@@ -150,6 +444,53 @@ class DocumentProcessor:
         chunks = self.chunk_documents(documents)
         return chunks
     
+    def load_and_chunk(self, pdf_path: str, extra_metadata: Optional[Dict] = None) -> Union[List[Document], Exception]:
+        """
+        Load and chunk one PDF; a chunking error is returned, not raised, so
+        one bad PDF can't stop a batch. extra_metadata is merged into every
+        chunk after splitting (it does not affect the contextual header).
+        """
+        documents = load_pdf(pdf_path, self.verbose)
+        if not documents:
+            return []
+        try:
+            chunks = self.chunk_documents(documents)
+        except Exception as e:
+            return e
+        if extra_metadata:
+            for chunk in chunks:
+                chunk.metadata.update(extra_metadata)
+        return chunks
+    
+    def iter_pdf_chunks(
+        self,
+        pdf_paths: Iterable[str],
+        max_workers: Optional[int] = None,
+        metadata_for: Optional[Callable[[str], Dict]] = None
+    ) -> Iterator[Tuple[str, Union[List[Document], Exception]]]:
+        """
+        Load and chunk PDFs, yielding each PDF's chunks as soon as they are
+        ready. Both steps run inside the worker processes — chunking is
+        pure-Python CPU work, so threads could not parallelize it — and only
+        the chunks cross back, so the caller never holds whole-corpus pages.
+        
+        Args:
+            pdf_paths: Paths to PDF files
+            max_workers: Worker processes (default: INGEST_N_THREADS or cpu_count - 1)
+            metadata_for: Returns extra metadata for a PDF's chunks (e.g. department);
+                evaluated here, and the dicts are merged in the workers
+        
+        Yields:
+            (pdf_path, chunks or the Exception raised while chunking) in completion order
+        """
+        pdf_paths = list(pdf_paths)
+        extra = [metadata_for(path) if metadata_for else None for path in pdf_paths]
+        yield from self._map_pdfs(
+            self.load_and_chunk, _worker_load_and_chunk, pdf_paths, max_workers,
+            initializer=_init_chunk_worker, initargs=(self.chunk_size, self.chunk_overlap, self.verbose),
+            arg_lists=(extra,)
+        )
+    
     def process_directory(self, directory_path: str, recursive: bool = True) -> List[Document]:
         """
         Complete pipeline: Load all PDFs from directory and chunk them
@@ -161,14 +502,29 @@ class DocumentProcessor:
         Returns:
             List of chunked Document objects ready for embedding
         """
-        documents = self.load_directory(directory_path, recursive)
-        if not documents:
-            return []
-        
-        chunks = self.chunk_documents(documents)
+        pdf_paths = self.find_pdfs(directory_path, recursive)
+        chunks = []
+        for pdf_path, pdf_chunks in self.iter_pdf_chunks(pdf_paths):
+            if isinstance(pdf_chunks, Exception):
+                print(f"[ERROR] chunking {pdf_path}: {str(pdf_chunks)}")
+                continue
+            chunks.extend(pdf_chunks)
         return chunks
 
 
+# Per-process processor for pool workers (built once by the pool initializer)
+_worker_processor: Optional[DocumentProcessor] = None
+
+
+def _init_chunk_worker(chunk_size: int, chunk_overlap: int, verbose: bool):
+    global _worker_processor
+    _worker_processor = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap, verbose=verbose)
+
+
+def _worker_load_and_chunk(pdf_path: str, extra_metadata: Optional[Dict] = None) -> Union[List[Document], Exception]:
+    return _worker_processor.load_and_chunk(pdf_path, extra_metadata)
+
+
 # Convenience function for quick testing
 def process_single_pdf(pdf_path: str) -> List[Document]:
     """Quick function to process a single PDF"""
@@ -0,0 +1,75 @@
+"""
+Micro-batching wrapper for query embeddings
+Concurrent requests each embed their question individually; this wrapper
+queues embed_query calls and lets a single worker thread run them through
+the model as one embed_documents batch, so N simultaneous users share one
+forward pass instead of N serial ones.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+class BatchingEmbeddings(Embeddings):
+    """Embeddings wrapper that coalesces concurrent embed_query calls into batches"""
+
+    def __init__(self, base: Embeddings, max_batch: int = 16, max_wait_ms: float = 10):
+        """
+        Initialize batching wrapper
+
+        Args:
+            base: Underlying embeddings model
+            max_batch: Maximum queries embedded in one forward pass
+            max_wait_ms: How long the worker waits for more queries after the first
+        """
+        self.base = base
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker_lock = threading.Lock()
+        self._worker: threading.Thread = None
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embed-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get(timeout=self.max_wait))
+            except queue.Empty:
+                pass
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.base.embed_documents(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query, sharing a forward pass with concurrent callers"""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Documents are already batched by the caller — pass straight through"""
+        return self.base.embed_documents(texts)
@@ -0,0 +1,107 @@
+"""
+Query embedding cache
+Each RAG request embeds the user's question more than once (semantic cache
+lookup, then Chroma's similarity search), and users repeat the same legal
+questions across sessions. This wrapper remembers query embeddings in an
+in-process LRU backed by a small SQLite table, so a repeated query costs a
+dictionary or index lookup instead of a model forward pass.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from semantic_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with a two-tier (memory + SQLite) cache for embed_query"""
+
+    def __init__(
+        self,
+        base: Embeddings,
+        path: Optional[str] = None,
+        namespace: str = "",
+        maxsize: int = 2048
+    ):
+        """
+        Initialize cached embeddings
+
+        Args:
+            base: Underlying embeddings model
+            path: SQLite file for the persistent tier (None = memory only)
+            namespace: Model/backend identifier mixed into keys so vectors from
+                a different model are never returned
+            maxsize: Entries kept in the in-process LRU
+        """
+        self.base = base
+        self.path = path
+        self.namespace = namespace
+        self._memory = LRUCache(maxsize)
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.namespace}\x00{text}".encode("utf-8")).digest()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite tier lazily, once per process (connections must not cross a fork)"""
+        if self.path is None:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            # WAL lets several server workers read while one writes
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS emb (hash BLOB PRIMARY KEY, vec BLOB)")
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
+
+    def _load(self, key: bytes) -> Optional[np.ndarray]:
+        try:
+            with self._db_lock:
+                db = self._connect()
+                if db is None:
+                    return None
+                row = db.execute("SELECT vec FROM emb WHERE hash = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Query embedding cache read failed (non-critical): %s", e)
+            return None
+        return np.frombuffer(row[0], dtype=np.float32) if row else None
+
+    def _store(self, key: bytes, vec: np.ndarray):
+        try:
+            with self._db_lock:
+                db = self._connect()
+                if db is None:
+                    return
+                db.execute("INSERT OR REPLACE INTO emb (hash, vec) VALUES (?, ?)", (key, vec.tobytes()))
+                db.commit()
+        except sqlite3.Error as e:
+            logger.warning("Query embedding cache write failed (non-critical): %s", e)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing a cached vector for text seen before"""
+        key = self._key(text)
+        vec = self._memory.get(key)
+        if vec is None:
+            vec = self._load(key)
+            if vec is None:
+                vec = np.asarray(self.base.embed_query(text), dtype=np.float32)
+                self._store(key, vec)
+            self._memory.put(key, vec)
+        return vec.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Document embedding (ingest) is not cached — pass straight through"""
+        return self.base.embed_documents(texts)
@@ -0,0 +1,36 @@
+"""
+Gunicorn config for the FastAPI server (uvicorn workers)
+
+Usage: gunicorn -c gunicorn.conf.py api:app
+
+The embedding model is loaded once in the master before workers are forked,
+so workers share its weights copy-on-write instead of each loading a copy.
+Chroma, the BM25 index and the Groq HTTP client are still opened per worker
+after the fork (SQLite handles and sockets must not cross a fork).
+"""
+
+import os
+
+# Serve on CPU unless a device is chosen explicitly. The embedding model
+# is preloaded before the fork, and a CUDA context cannot be inherited.
+os.environ.setdefault("EMBED_DEVICE", "cpu")
+
+bind = "0.0.0.0:5000"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# uvicorn's worker picks uvloop + httptools automatically when installed
+worker_class = "uvicorn_worker.UvicornWorker"
+# First request per worker loads Chroma + BM25 — allow for it
+timeout = 120
+
+
+def on_starting(server):
+    """Runs in the master before any worker is forked"""
+    if os.environ["EMBED_DEVICE"] != "cpu":
+        server.log.info("EMBED_DEVICE=%s: skipping preload, each worker loads its own model", os.environ["EMBED_DEVICE"])
+        return
+    try:
+        from vector_store import get_embeddings
+        get_embeddings()
+        server.log.info("Embedding model preloaded in master (shared with workers)")
+    except Exception as e:
+        server.log.warning("Embedding preload failed, workers will load their own: %s", e)
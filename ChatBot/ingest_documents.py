@@ -3,11 +3,299 @@ Document Ingestion Script for RAG Pipeline
 Processes PDFs and creates/updates vector store
 """
 
+import hashlib
+import logging
 import os
+import queue
 import sys
+import threading
+import time
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from typing import Callable, Dict, List, Optional
+from tqdm import tqdm
+from langchain_core.documents import Document
 from document_processor import DocumentProcessor
 from vector_store import VectorStoreManager
 
+# Per-PDF failures and tracebacks go to the log file rather than the console,
+# so a batch of broken PDFs doesn't stall the run on terminal writes
+logger = logging.getLogger("ingest")
+logger.addHandler(logging.NullHandler())
+
+INGEST_LOG_FILE = os.getenv("INGEST_LOG_FILE", "ingest.log")
+
+
+def configure_logging():
+    """Log to a rotating INGEST_LOG_FILE (LOG_LEVEL sets the level, default INFO)"""
+    handler = RotatingFileHandler(INGEST_LOG_FILE, maxBytes=10_000_000, backupCount=3, encoding="utf-8")
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        handlers=[handler]
+    )
+
+
+# Chunks per bulk_upsert call. Larger batches amortize Chroma's per-call
+# upsert overhead; the embedding model still encodes in its own
+# mini-batches (EMBED_ENCODE_BATCH_SIZE, see vector_store.py).
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "2048"))
+
+# Chunking settings shared by every ingest mode
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+
+@lru_cache(maxsize=None)
+def get_processor(verbose: bool = False) -> DocumentProcessor:
+    """One DocumentProcessor per verbosity, reused across ingest modes"""
+    return DocumentProcessor(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, verbose=verbose)
+
+
+# Bytes read from each end of a PDF for its fingerprint
+FINGERPRINT_BYTES = 64 * 1024
+
+
+def pdf_fingerprint(pdf_path: str) -> str:
+    """Cheap content fingerprint of a PDF: its size plus the first and last 64 KB"""
+    size = os.path.getsize(pdf_path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(pdf_path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if size > FINGERPRINT_BYTES:
+            f.seek(max(FINGERPRINT_BYTES, size - FINGERPRINT_BYTES))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class PdfHashIndex:
+    """
+    Fingerprints of PDFs already embedded into a collection, kept in a file
+    next to the store so re-runs and identical copies of a PDF (same file
+    under another name or folder) are not parsed and embedded again.
+    Keys are scoped per department, like chunk dedup, so a law filed under
+    two departments stays retrievable with either department filter.
+    """
+    
+    def __init__(self, manager: VectorStoreManager):
+        self.path = os.path.join(manager.persist_directory, f".pdf_hashes-{manager.collection_name}")
+        self.seen = set()
+        self._pending: Dict[str, str] = {}
+        self._done: List[str] = []
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.seen.update(line.strip() for line in f if line.strip())
+    
+    def filter_new(self, pdf_files: List[str], department_of: Callable[[str], str]) -> List[str]:
+        """Drop PDFs already ingested (or repeated in this list) and remember the rest's keys"""
+        new_files = []
+        keys = set()
+        for pdf_path in pdf_files:
+            key = f"{department_of(pdf_path)}\t{pdf_fingerprint(pdf_path)}"
+            if key in self.seen or key in keys:
+                continue
+            keys.add(key)
+            self._pending[pdf_path] = key
+            new_files.append(pdf_path)
+        return new_files
+    
+    def mark_done(self, pdf_path: str):
+        """Record a PDF whose chunks were handed to the embed stage"""
+        key = self._pending.pop(pdf_path, None)
+        if key is not None:
+            self.seen.add(key)
+            self._done.append(key)
+    
+    def save(self):
+        """Append newly ingested keys to the index file"""
+        if not self._done:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(f"{key}\n" for key in self._done)
+        self._done = []
+
+
+def run_ingest_pipeline(
+    processor: DocumentProcessor,
+    pdf_files: List[str],
+    on_pdf: Callable[[int, str, List[Document], Optional[Exception]], None],
+    add_batch: Callable[[List[Document]], int],
+    batch_size: int = INGEST_BATCH_SIZE,
+    flush_seconds: float = 2.0,
+    queue_depth: int = 8,
+    desc: str = "PDFs",
+    file_index: Optional[PdfHashIndex] = None,
+    metadata_for: Optional[Callable[[str], Dict]] = None,
+    add_duplicate_sources: Optional[Callable[[Dict[str, List[str]]], None]] = None
+) -> Dict[str, int]:
+    """
+    Load+chunk -> tag -> embed as three overlapping stages joined by bounded
+    queues, so PDF parsing and chunking (in worker processes) run while
+    earlier chunks are being embedded. The worker pool only has a small
+    window of PDFs submitted at a time (see DocumentProcessor._map_pdfs), so
+    a full queue stalls the workers: at most about 2 * queue_depth plus the
+    pool window of PDFs' chunks are held in memory at once.
+    Chunks whose text (content_hash) was already seen in the same department
+    during this run are dropped before embedding; the dropped chunk's
+    source/page is recorded on the kept one through add_duplicate_sources.
+    content_hash itself is only needed here and is removed before storage.
+    Progress is shown as a single tqdm bar; on_pdf/add_batch should report
+    through the "ingest" logger (or tqdm.write) so the bar is not broken.
+    
+    Args:
+        processor: DocumentProcessor used to load and chunk PDFs
+        pdf_files: PDF paths to ingest
+        on_pdf: Called per PDF as (index, path, chunks, error) — report failures here
+        add_batch: Stores one batch of chunks in the vector store and returns how
+            many were actually written (e.g. VectorStoreManager.bulk_upsert)
+        batch_size: Chunks per add_batch call
+        flush_seconds: Flush a partial batch if nothing arrives for this long
+        queue_depth: Max items waiting between stages (backpressure)
+        desc: Progress bar label
+        file_index: Records successfully ingested PDFs; saved once every batch is stored
+        metadata_for: Extra metadata for a PDF's chunks (department etc.), merged in the workers
+        add_duplicate_sources: Called once at the end with {kept chunk ID: ["source p.page", ...]}
+            for the duplicates dropped (e.g. VectorStoreManager.add_duplicate_sources)
+    
+    Returns:
+        Dict with successful, failed, chunks (newly written) and duplicates counts
+    """
+    load_q: "queue.Queue" = queue.Queue(maxsize=queue_depth)
+    embed_q: "queue.Queue" = queue.Queue(maxsize=queue_depth)
+    stats = {"successful": 0, "failed": 0, "chunks": 0, "duplicates": 0}
+    # (department, content_hash) -> ID of the chunk kept for that text
+    kept_ids: Dict[tuple, str] = {}
+    duplicate_sources: Dict[str, List[str]] = {}
+    errors: List[BaseException] = []
+    stop = threading.Event()
+    
+    def loader():
+        items = processor.iter_pdf_chunks(pdf_files, metadata_for=metadata_for)
+        try:
+            for item in items:
+                if stop.is_set():
+                    break
+                load_q.put(item)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            # Cancel PDFs still waiting in the pool instead of parsing them all
+            items.close()
+            load_q.put(None)
+    
+    progress = tqdm(
+        total=len(pdf_files), desc=desc, unit="pdf",
+        miniters=max(1, len(pdf_files) // 1000)
+    )
+    
+    def tally(outcome: str):
+        stats[outcome] += 1
+        progress.set_postfix(ok=stats["successful"], fail=stats["failed"], refresh=False)
+        progress.update(1)
+    
+    def chunker():
+        try:
+            i = 0
+            while True:
+                item = load_q.get()
+                if item is None:
+                    break
+                if stop.is_set():
+                    continue
+                i += 1
+                pdf_path, chunks = item
+                if isinstance(chunks, Exception):
+                    on_pdf(i, pdf_path, [], chunks)
+                    tally("failed")
+                    continue
+                on_pdf(i, pdf_path, chunks, None)
+                if not chunks:
+                    tally("failed")
+                    continue
+                tally("successful")
+                if file_index is not None:
+                    file_index.mark_done(pdf_path)
+                
+                unique = []
+                for chunk in chunks:
+                    metadata = chunk.metadata
+                    content_hash = metadata.pop('content_hash', None)
+                    if content_hash is not None:
+                        key = (metadata.get('department'), content_hash)
+                        kept_id = kept_ids.get(key)
+                        if kept_id is not None:
+                            stats["duplicates"] += 1
+                            duplicate_sources.setdefault(kept_id, []).append(
+                                f"{metadata.get('source', '')} p.{metadata.get('page', '')}"
+                            )
+                            continue
+                        kept_ids[key] = VectorStoreManager.chunk_id(chunk)
+                    unique.append(chunk)
+                if unique:
+                    embed_q.put(unique)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+            # Keep draining so the loader never blocks on a full queue
+            while load_q.get() is not None:
+                pass
+        finally:
+            embed_q.put(None)
+    
+    threads = [
+        threading.Thread(target=loader, name="ingest-load", daemon=True),
+        threading.Thread(target=chunker, name="ingest-chunk", daemon=True),
+    ]
+    for t in threads:
+        t.start()
+    
+    # Embed stage runs here: flush at batch_size chunks, or when the
+    # pending batch has waited flush_seconds for more input
+    pending: List[Document] = []
+    last_flush = time.time()
+    done = False
+    try:
+        while not done:
+            timeout = max(0.0, flush_seconds - (time.time() - last_flush)) if pending else None
+            try:
+                chunks = embed_q.get(timeout=timeout)
+            except queue.Empty:
+                chunks = []
+            if chunks is None:
+                done = True
+            else:
+                pending.extend(chunks)
+            
+            while len(pending) >= batch_size:
+                stats["chunks"] += add_batch(pending[:batch_size])
+                pending = pending[batch_size:]
+                last_flush = time.time()
+            
+            if pending and (done or time.time() - last_flush >= flush_seconds):
+                stats["chunks"] += add_batch(pending)
+                pending = []
+                last_flush = time.time()
+    except BaseException:
+        # Stop the other stages and unblock the chunker so they can exit
+        # (unless its end marker was already received — e.g. the final flush failed)
+        stop.set()
+        while not done and embed_q.get() is not None:
+            pass
+        raise
+    finally:
+        progress.close()
+    
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    if add_duplicate_sources is not None and duplicate_sources:
+        add_duplicate_sources(duplicate_sources)
+    if file_index is not None:
+        file_index.save()
+    return stats
+
 
 def ingest_test_pdf():
     """Ingest the test PDF (Pakistan's Constitution)"""
@@ -30,7 +318,7 @@ def ingest_test_pdf():
         # Step 1: Process PDF
         print("Step 1: Loading and chunking PDF...")
         print("-" * 60)
-        processor = DocumentProcessor(chunk_size=1000, chunk_overlap=200)
+        processor = get_processor(verbose=True)
         chunks = processor.process_pdf(test_pdf)
         
         if not chunks:
@@ -38,6 +326,9 @@ def ingest_test_pdf():
             return False
         
         print(f"\n✓ Created {len(chunks)} chunks")
+        # content_hash only serves ingest-time dedup; keep it out of the store
+        for chunk in chunks:
+            chunk.metadata.pop('content_hash', None)
         
         # Show sample chunk
         print("\n[Sample chunk]:")
@@ -92,9 +383,8 @@ def ingest_test_pdf():
         
     except Exception as e:
         print(f"\n\n[ERROR] during ingestion:")
-        print(f"   {str(e)}")
-        import traceback
-        traceback.print_exc()
+        print(f"   {str(e)} (traceback in {INGEST_LOG_FILE})")
+        logger.exception("Ingestion failed")
         return False
 
 
@@ -114,11 +404,7 @@ def ingest_full_dataset():
     print(f"\n[*] Scanning for PDFs in: {data_dir}")
     
     # First, collect all PDF paths
-    pdf_files = []
-    for root, dirs, files in os.walk(data_dir):
-        for file in files:
-            if file.lower().endswith('.pdf'):
-                pdf_files.append(os.path.join(root, file))
+    pdf_files = DocumentProcessor.find_pdfs(data_dir)
     
     total_pdfs = len(pdf_files)
     print(f"[*] Found {total_pdfs} PDF files to process")
@@ -129,95 +415,78 @@ def ingest_full_dataset():
         return False
     
     try:
-        # Step 1: Process PDFs with progress tracking
-        print("Step 1: Loading and chunking all PDFs...")
+        # Load, chunk and embed as one overlapping pipeline
+        print("Loading, chunking and embedding all PDFs...")
         print("-" * 60)
+        print("[!] Initializing embeddings (may take a moment on first run)...\n")
+        
+        processor = get_processor()
+        
+        manager = VectorStoreManager(
+            persist_directory="vectorstores/chroma_db_full",
+            collection_name="kpk_laws_full"
+        )
+        
+        def department_of(path):
+            return os.path.basename(os.path.dirname(path))
         
-        from document_processor import DocumentProcessor
-        processor = DocumentProcessor(chunk_size=1000, chunk_overlap=200)
+        # Skip PDFs already in the store and identical copies within a department
+        file_index = PdfHashIndex(manager)
+        pdf_files = file_index.filter_new(pdf_files, department_of)
+        skipped_files = total_pdfs - len(pdf_files)
+        total_pdfs = len(pdf_files)
+        if skipped_files:
+            print(f"[*] Skipping {skipped_files} PDFs already ingested or duplicated")
         
-        all_chunks = []
-        successful = 0
-        failed = 0
         failed_files = []
         
-        for i, pdf_path in enumerate(pdf_files, 1):
+        def on_pdf(i, pdf_path, chunks, error):
             pdf_name = os.path.basename(pdf_path)
             dept_name = os.path.basename(os.path.dirname(pdf_path))
             
-            try:
-                # Show progress
-                print(f"\n[{i}/{total_pdfs}] Processing: {pdf_name[:50]}...")
-                print(f"    Department: {dept_name}")
-                
-                chunks = processor.process_pdf(pdf_path)
-                
-                if chunks:
-                    # Add department metadata
-                    for chunk in chunks:
-                        chunk.metadata['department'] = dept_name
-                    
-                    all_chunks.extend(chunks)
-                    successful += 1
-                    print(f"    [OK] Created {len(chunks)} chunks")
-                else:
-                    failed += 1
-                    failed_files.append(pdf_name)
-                    print(f"    [WARN] No chunks created")
-                    
-            except Exception as e:
-                failed += 1
+            if error is not None:
+                failed_files.append(pdf_name)
+                logger.error("[%d/%d] %s/%s failed: %s", i, total_pdfs, dept_name, pdf_name, error)
+            elif not chunks:
                 failed_files.append(pdf_name)
-                print(f"    [ERROR] Failed: {str(e)[:50]}")
-                continue  # Skip to next PDF
+                logger.warning("[%d/%d] No chunks created: %s/%s", i, total_pdfs, dept_name, pdf_name)
+        
+        batch_num = 0
+        
+        def add_batch(batch):
+            nonlocal batch_num
+            batch_num += 1
+            logger.info("[Batch %d] Embedding %d chunks", batch_num, len(batch))
+            # Creates the store on the first batch
+            return manager.bulk_upsert(batch)
+        
+        stats = run_ingest_pipeline(
+            processor, pdf_files, on_pdf, add_batch,
+            desc="kpk_laws", file_index=file_index, metadata_for=lambda path: {'department': department_of(path)},
+            add_duplicate_sources=manager.add_duplicate_sources
+        )
+        successful = stats["successful"]
+        failed = stats["failed"]
         
         print("\n" + "-" * 60)
         print(f"[Summary] Processed: {successful}/{total_pdfs} PDFs successfully")
-        print(f"          Total chunks: {len(all_chunks)}")
+        print(f"          New chunks written: {stats['chunks']} ({stats['duplicates']} duplicates skipped)")
+        if skipped_files:
+            print(f"          Skipped PDFs: {skipped_files} (already ingested or duplicated)")
         if failed > 0:
             print(f"          Failed: {failed} PDFs")
         
-        if not all_chunks:
+        if stats["chunks"] == 0 and not skipped_files:
             print("\n[ERROR] No chunks created. Aborting.")
             return False
         
-        # Step 2: Create vector store
-        print("\n\nStep 2: Creating vector store...")
-        print("-" * 60)
-        print("[!] Initializing embeddings (may take a moment on first run)...\n")
-        
-        manager = VectorStoreManager(
-            persist_directory="vectorstores/chroma_db_full",
-            collection_name="kpk_laws_full"
-        )
-        
-        # Process in batches to avoid memory issues
-        batch_size = 500
-        total_batches = (len(all_chunks) + batch_size - 1) // batch_size
-        
-        print(f"[*] Creating vector store with {len(all_chunks)} chunks in {total_batches} batches...")
-        
-        for batch_num in range(total_batches):
-            start_idx = batch_num * batch_size
-            end_idx = min((batch_num + 1) * batch_size, len(all_chunks))
-            batch = all_chunks[start_idx:end_idx]
-            
-            print(f"\n[Batch {batch_num + 1}/{total_batches}] Processing chunks {start_idx + 1} to {end_idx}...")
-            
-            if batch_num == 0:
-                # Create new vector store with first batch
-                manager.create_vectorstore(batch)
-            else:
-                # Add subsequent batches
-                manager.add_documents(batch)
-        
         # Success summary
         print("\n\n" + "=" * 60)
         print("[SUCCESS] FULL DATASET INGESTION COMPLETED")
         print("=" * 60)
         print(f"[Summary]:")
         print(f"   - PDFs processed: {successful}/{total_pdfs}")
-        print(f"   - Total chunks: {len(all_chunks)}")
+        print(f"   - New chunks written: {stats['chunks']}")
         print(f"   - Vector store: vectorstores/chroma_db_full")
         print(f"   - Collection: kpk_laws_full")
         
@@ -227,14 +496,14 @@ def ingest_full_dataset():
                 print(f"   - {f}")
             if len(failed_files) > 5:
                 print(f"   ... and {len(failed_files) - 5} more")
+            print(f"   (details in {INGEST_LOG_FILE})")
         
         return True
         
     except Exception as e:
         print(f"\n\n[ERROR] during ingestion:")
-        print(f"   {str(e)}")
-        import traceback
-        traceback.print_exc()
+        print(f"   {str(e)} (traceback in {INGEST_LOG_FILE})")
+        logger.exception("Ingestion failed")
         return False
 
 
@@ -257,8 +526,6 @@ def ingest_additional_laws(folders=None):
     try:
         # Step 1: Load existing vector store
         print("\n[*] Loading existing vector store...")
-        from vector_store import VectorStoreManager
-        from document_processor import DocumentProcessor
         
         vs_manager = VectorStoreManager(
             persist_directory="vectorstores/chroma_db_full",
@@ -274,7 +541,8 @@ def ingest_additional_laws(folders=None):
         initial_count = vs_manager.vectorstore._collection.count()
         print(f"[*] Current chunks in store: {initial_count}")
         
-        processor = DocumentProcessor(chunk_size=1000, chunk_overlap=200)
+        processor = get_processor()
+        file_index = PdfHashIndex(vs_manager)
         
         total_new_chunks = 0
         
@@ -292,11 +560,7 @@ def ingest_additional_laws(folders=None):
             print("=" * 60)
             
             # Collect PDFs recursively
-            pdf_files = []
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    if file.lower().endswith('.pdf'):
-                        pdf_files.append(os.path.join(root, file))
+            pdf_files = DocumentProcessor.find_pdfs(folder_path)
             
             print(f"[*] Found {len(pdf_files)} PDF files")
             
@@ -304,54 +568,44 @@ def ingest_additional_laws(folders=None):
                 print(f"[WARN] No PDFs in {folder_name}")
                 continue
             
-            # Process each PDF
-            folder_chunks = []
-            successful = 0
-            failed = 0
+            found = len(pdf_files)
+            pdf_files = file_index.filter_new(pdf_files, lambda path: folder_name)
+            if found > len(pdf_files):
+                print(f"[*] Skipping {found - len(pdf_files)} PDFs already ingested or duplicated")
+            if not pdf_files:
+                continue
             
-            for i, pdf_path in enumerate(pdf_files, 1):
-                pdf_name = os.path.basename(pdf_path)
+            law_type = folder_name.replace('_laws', '').upper()
+            
+            # Load, chunk and embed this folder as one overlapping pipeline
+            def metadata_for(pdf_path):
                 # Get category from subfolder
                 rel_path = os.path.relpath(pdf_path, folder_path)
                 category = os.path.dirname(rel_path) if os.path.dirname(rel_path) else folder_name
-                
-                try:
-                    print(f"  [{i}/{len(pdf_files)}] {pdf_name[:45]}...", end=" ")
-                    
-                    chunks = processor.process_pdf(pdf_path)
-                    
-                    if chunks:
-                        # Add metadata
-                        for chunk in chunks:
-                            chunk.metadata['department'] = folder_name
-                            chunk.metadata['category'] = category
-                            chunk.metadata['law_type'] = folder_name.replace('_laws', '').upper()
-                        
-                        folder_chunks.extend(chunks)
-                        successful += 1
-                        print(f"[OK] {len(chunks)} chunks")
-                    else:
-                        failed += 1
-                        print("[WARN] No chunks")
-                        
-                except Exception as e:
-                    failed += 1
-                    print(f"[ERROR] {str(e)[:30]}")
-                    continue
+                return {'department': folder_name, 'category': category, 'law_type': law_type}
             
-            # Add to vector store in batches
-            if folder_chunks:
-                print(f"\n[*] Adding {len(folder_chunks)} chunks to vector store...")
-                
-                batch_size = 500
-                for i in range(0, len(folder_chunks), batch_size):
-                    batch = folder_chunks[i:i + batch_size]
-                    vs_manager.add_documents(batch)
-                    print(f"    Added batch {i//batch_size + 1}/{(len(folder_chunks)-1)//batch_size + 1}")
-                
-                total_new_chunks += len(folder_chunks)
+            def on_pdf(i, pdf_path, chunks, error):
+                if error is not None:
+                    logger.error("[%d/%d] %s failed: %s", i, len(pdf_files), pdf_path, error)
+                elif not chunks:
+                    logger.warning("[%d/%d] No chunks: %s", i, len(pdf_files), pdf_path)
             
-            print(f"\n[DONE] {folder_name}: {successful} PDFs, {len(folder_chunks)} chunks")
+            def add_batch(batch):
+                written = vs_manager.bulk_upsert(batch)
+                logger.info("Added %d of %d chunks to vector store", written, len(batch))
+                return written
+            
+            stats = run_ingest_pipeline(
+                processor, pdf_files, on_pdf, add_batch,
+                desc=folder_name, file_index=file_index, metadata_for=metadata_for,
+                add_duplicate_sources=vs_manager.add_duplicate_sources
+            )
+            successful = stats["successful"]
+            total_new_chunks += stats["chunks"]
+            
+            print(f"\n[DONE] {folder_name}: {successful} PDFs, {stats['chunks']} chunks ({stats['duplicates']} duplicates skipped)")
+            if stats["failed"]:
+                print(f"[WARN] {stats['failed']} PDFs failed (details in {INGEST_LOG_FILE})")
         
         # Final summary
         final_count = vs_manager.vectorstore._collection.count()
@@ -367,9 +621,8 @@ def ingest_additional_laws(folders=None):
         
     except Exception as e:
         print(f"\n\n[ERROR] during ingestion:")
-        print(f"   {str(e)}")
-        import traceback
-        traceback.print_exc()
+        print(f"   {str(e)} (traceback in {INGEST_LOG_FILE})")
+        logger.exception("Ingestion failed")
         return False
 
 
@@ -380,7 +633,6 @@ def ingest_pakistan_code():
     already embedded and SKIPS them. Only processes remaining categories.
     Safe to stop (Ctrl+C) and re-run — it picks up where it left off.
     """
-    import time
     start_time = time.time()
     
     print("=" * 60)
@@ -394,24 +646,21 @@ def ingest_pakistan_code():
         return False
     
     # Get all category folders (skip files like scrape_results.json)
-    categories = sorted([
-        d for d in os.listdir(data_dir) 
-        if os.path.isdir(os.path.join(data_dir, d))
-    ])
+    with os.scandir(data_dir) as entries:
+        categories = sorted(e.name for e in entries if e.is_dir())
     
     # Initialize
-    processor = DocumentProcessor(chunk_size=1000, chunk_overlap=200)
+    processor = get_processor()
     vs_manager = VectorStoreManager(
         persist_directory="vectorstores/chroma_db_full",
         collection_name="paklaw_docs"
     )
+    file_index = PdfHashIndex(vs_manager)
     
     # Check if vector store already exists (for resume)
     already_done = set()
-    store_exists = False
     
     if vs_manager.load_vectorstore() is not None:
-        store_exists = True
         try:
             # Get all unique departments already in the store
             collection = vs_manager.vectorstore._collection
@@ -446,9 +695,11 @@ def ingest_pakistan_code():
     
     print(f"\n[*] Categories to process:")
     total_pdfs = 0
+    category_pdfs = {}
     for cat in remaining:
-        cat_path = os.path.join(data_dir, cat)
-        pdf_count = len([f for f in os.listdir(cat_path) if f.lower().endswith('.pdf')])
+        # PDFs sit directly inside each category folder
+        category_pdfs[cat] = DocumentProcessor.find_pdfs(os.path.join(data_dir, cat), recursive=False)
+        pdf_count = len(category_pdfs[cat])
         total_pdfs += pdf_count
         print(f"    - {cat} ({pdf_count} PDFs)")
     
@@ -461,74 +712,46 @@ def ingest_pakistan_code():
         
         # Process each remaining category
         for cat_idx, category in enumerate(remaining, 1):
-            cat_path = os.path.join(data_dir, category)
-            
-            # Get PDFs in this category
-            pdf_files = [
-                os.path.join(cat_path, f) 
-                for f in os.listdir(cat_path) 
-                if f.lower().endswith('.pdf')
-            ]
+            # PDFs in this category (listed once above)
+            pdf_files = category_pdfs[category]
             
+            found = len(pdf_files)
+            pdf_files = file_index.filter_new(pdf_files, lambda path: category)
             if not pdf_files:
-                print(f"\n[{cat_idx}/{len(remaining)}] {category} - No PDFs, skipping")
+                print(f"\n[{cat_idx}/{len(remaining)}] {category} - No new PDFs, skipping")
                 continue
             
             print(f"\n{'─' * 60}")
             print(f"[{cat_idx}/{len(remaining)}] {category} ({len(pdf_files)} PDFs)")
+            if found > len(pdf_files):
+                print(f"  Skipping {found - len(pdf_files)} PDFs already ingested or duplicated")
             print(f"{'─' * 60}")
             
-            cat_chunks = []
-            cat_success = 0
-            cat_failed = 0
-            
-            for i, pdf_path in enumerate(pdf_files, 1):
+            # Load, chunk and embed this category as one overlapping pipeline
+            def on_pdf(i, pdf_path, chunks, error):
                 pdf_name = os.path.basename(pdf_path)
-                try:
-                    print(f"  [{i}/{len(pdf_files)}] {pdf_name[:55]}...", end=" ")
-                    
-                    chunks = processor.process_pdf(pdf_path)
-                    
-                    if chunks:
-                        # Tag chunks with category metadata
-                        for chunk in chunks:
-                            chunk.metadata['department'] = category
-                        
-                        cat_chunks.extend(chunks)
-                        cat_success += 1
-                        print(f"-> {len(chunks)} chunks")
-                    else:
-                        cat_failed += 1
-                        print("-> [WARN] No chunks")
-                        
-                except Exception as e:
-                    cat_failed += 1
-                    print(f"-> [ERROR] {str(e)[:40]}")
-                    continue
-            
-            # Add this category's chunks to vector store
-            if cat_chunks:
-                batch_size = 500
-                total_batches = (len(cat_chunks) + batch_size - 1) // batch_size
                 
-                for b in range(total_batches):
-                    start = b * batch_size
-                    end = min((b + 1) * batch_size, len(cat_chunks))
-                    batch = cat_chunks[start:end]
-                    
-                    if not store_exists:
-                        # First time ever — create the store
-                        vs_manager.create_vectorstore(batch)
-                        store_exists = True
-                    else:
-                        # Append to existing store
-                        vs_manager.add_documents(batch)
-                
-                print(f"  [OK] {category}: {cat_success} PDFs, {len(cat_chunks)} chunks embedded")
+                if error is not None:
+                    logger.error("[%d/%d] %s/%s failed: %s", i, len(pdf_files), category, pdf_name, error)
+                elif not chunks:
+                    logger.warning("[%d/%d] No chunks: %s/%s", i, len(pdf_files), category, pdf_name)
+            
+            def add_batch(batch):
+                # Creates the store the first time ever, appends after that
+                return vs_manager.bulk_upsert(batch)
+            
+            stats = run_ingest_pipeline(
+                processor, pdf_files, on_pdf, add_batch,
+                desc=category, file_index=file_index, metadata_for=lambda path: {'department': category},
+                add_duplicate_sources=vs_manager.add_duplicate_sources
+            )
             
-            grand_total_chunks += len(cat_chunks)
-            grand_total_success += cat_success
-            grand_total_failed += cat_failed
+            if stats["chunks"]:
+                print(f"  [OK] {category}: {stats['successful']} PDFs, {stats['chunks']} chunks embedded ({stats['duplicates']} duplicates skipped)")
+            
+            grand_total_chunks += stats["chunks"]
+            grand_total_success += stats["successful"]
+            grand_total_failed += stats["failed"]
         
         # Final summary
         elapsed = time.time() - start_time
@@ -546,7 +769,7 @@ def ingest_pakistan_code():
         print(f"{'=' * 60}")
         print(f"  New chunks added:    {grand_total_chunks}")
         print(f"  PDFs processed:      {grand_total_success}")
-        print(f"  PDFs failed:         {grand_total_failed}")
+        print(f"  PDFs failed:         {grand_total_failed}" + (f" (details in {INGEST_LOG_FILE})" if grand_total_failed else ""))
         print(f"  Total in store now:  {final_count}")
         print(f"  Time taken:          {mins}m {secs}s")
         print(f"{'=' * 60}")
@@ -556,13 +779,14 @@ def ingest_pakistan_code():
         return grand_total_chunks > 0
         
     except Exception as e:
-        print(f"\n[ERROR] {str(e)}")
-        import traceback
-        traceback.print_exc()
+        print(f"\n[ERROR] {str(e)} (traceback in {INGEST_LOG_FILE})")
+        logger.exception("Pakistan Code ingestion failed")
         return False
 
 
 if __name__ == "__main__":
+    configure_logging()
+    
     # Default: Run test ingestion
     mode = sys.argv[1] if len(sys.argv) > 1 else "test"
     
@@ -3,13 +3,26 @@ Advanced Retriever for RAG Pipeline
 Implements Hybrid Search (Semantic + BM25), Reranking, and Query Expansion
 """
 
+import glob
+import hashlib
+import heapq
+import logging
+import os
+import pickle
 import re
 import time
+from functools import lru_cache
 import numpy as np
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Tuple, Optional, Dict, Any
 from rank_bm25 import BM25Okapi
 from langchain_core.documents import Document
+from semantic_cache import LRUCache, SemanticCache
+
+# Per-query messages from search() go through this logger (DEBUG for timing
+# and expansion) so the request path stays quiet at the default level
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 
 # Pakistani Legal Synonym Map for Query Expansion
@@ -68,10 +81,12 @@ LEGAL_SYNONYMS = {
 }
 
 
+@lru_cache(maxsize=4096)
 def expand_query(query: str) -> str:
     """
     Expand query with legal synonyms to improve retrieval.
     Returns the original query + relevant synonym terms appended.
+    Cached like _tokenize_query: repeat questions skip the synonym scan.
     """
     query_lower = query.lower()
     expansions = []
@@ -92,6 +107,115 @@ def expand_query(query: str) -> str:
     return query
 
 
+_TOKEN_RE = re.compile(r'\b\w+\b')
+
+
+def tokenize(text: str) -> List[str]:
+    """Simple tokenization - lowercase and split on whitespace/punctuation"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+@lru_cache(maxsize=4096)
+def _tokenize_query(query: str) -> Tuple[str, ...]:
+    """Cached query tokenization — repeat queries skip the regex pass"""
+    return tuple(tokenize(query))
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest positive scores, best first. argpartition finds
+    the top k in O(N); only those k are then sorted, not the whole corpus.
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(scores, -k)[-k:]
+    top = top[np.argsort(-scores[top])]
+    return top[scores[top] > 0]
+
+
+class SparseBM25Scorer:
+    """
+    Vectorized BM25Okapi scoring over a precomputed inverted index.
+    rank_bm25's get_scores walks every document's term dict in Python for
+    each query token; here each term maps to a slice of (doc indices, weights)
+    arrays with IDF and length normalization folded in, so scoring a query is
+    one NumPy scatter-add per token. Scores match BM25Okapi.get_scores exactly.
+    The postings are stored CSR-style (offsets + two flat arrays) so they can
+    be saved with np.save and memory-mapped back on the next start.
+    """
+
+    _ARRAYS = ("offsets", "doc_ids", "weights")
+
+    def __init__(
+        self,
+        corpus_size: int,
+        terms: List[str],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        weights: np.ndarray
+    ):
+        self.corpus_size = corpus_size
+        self.terms = terms
+        self._term_rows = {term: row for row, term in enumerate(terms)}
+        self._offsets = offsets
+        self._doc_ids = doc_ids
+        self._weights = weights
+
+    @classmethod
+    def from_bm25(cls, bm25: BM25Okapi) -> "SparseBM25Scorer":
+        """Build the postings from a fitted BM25Okapi"""
+        doc_len = np.asarray(bm25.doc_len, dtype=np.float64)
+        norm = bm25.k1 * (1 - bm25.b + bm25.b * doc_len / bm25.avgdl)
+
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        for doc_idx, freqs in enumerate(bm25.doc_freqs):
+            for term, tf in freqs.items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = ([], [])
+                entry[0].append(doc_idx)
+                entry[1].append(tf)
+
+        terms = list(postings)
+        lengths = np.fromiter((len(postings[t][0]) for t in terms), dtype=np.int64, count=len(terms))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        weights = np.empty(offsets[-1], dtype=np.float64)
+        for row, term in enumerate(terms):
+            ids, tfs = postings[term]
+            start, end = offsets[row], offsets[row + 1]
+            idf = bm25.idf.get(term) or 0
+            ids = np.asarray(ids, dtype=np.int32)
+            tf = np.asarray(tfs, dtype=np.float64)
+            doc_ids[start:end] = ids
+            weights[start:end] = idf * tf * (bm25.k1 + 1) / (tf + norm[ids])
+        return cls(bm25.corpus_size, terms, offsets, doc_ids, weights)
+
+    def save(self, prefix: str):
+        """Write the posting arrays to <prefix>.<name>.npy (terms are pickled by the caller)"""
+        for name in self._ARRAYS:
+            np.save(f"{prefix}.{name}.npy", getattr(self, f"_{name}"))
+
+    @classmethod
+    def load(cls, prefix: str, corpus_size: int, terms: List[str]) -> "SparseBM25Scorer":
+        """Memory-map posting arrays written by save() — pages are shared across workers"""
+        arrays = [np.load(f"{prefix}.{name}.npy", mmap_mode="r") for name in cls._ARRAYS]
+        return cls(corpus_size, terms, *arrays)
+
+    def get_scores(self, query_tokens) -> np.ndarray:
+        """BM25 score of every document for the tokenized query"""
+        scores = np.zeros(self.corpus_size)
+        for token in query_tokens:
+            row = self._term_rows.get(token)
+            if row is not None:
+                start, end = self._offsets[row], self._offsets[row + 1]
+                # Doc indices within one posting list are unique, so += is safe
+                scores[self._doc_ids[start:end]] += self._weights[start:end]
+        return scores
+
+
 class HybridRetriever:
     """
     Advanced retriever combining:
@@ -101,20 +225,48 @@ class HybridRetriever:
     4. Optional reranking based on relevance scores
     """
     
-    def __init__(self, vectorstore, documents: List[Document] = None):
+    def __init__(self, vectorstore, documents: List[Document] = None, prebuilt_bm25: Dict[str, Any] = None):
         """
         Initialize hybrid retriever
         
         Args:
             vectorstore: ChromaDB vector store instance
             documents: Original documents for BM25 indexing
+            prebuilt_bm25: BM25 state from load_bm25_index() — skips rebuilding the index
         """
         self.vectorstore = vectorstore
         self.documents = documents or []
-        self.bm25 = None
         self.tokenized_docs = []
+        self._scorer: Optional[SparseBM25Scorer] = None
+        # department -> (scorer over that department's docs, its docs)
+        self._category_bm25: Dict[str, Tuple[SparseBM25Scorer, List[Document]]] = {}
+        # doc_id -> (token set of the first 500 chars, lowercased text) for rerank
+        self._rerank_features = LRUCache(maxsize=4096)
+        # Long-lived pool for the parallel semantic + BM25 legs of search().
+        # Shared by concurrent requests, so it holds two legs for several
+        # in-flight queries (letting the embedding batcher coalesce them).
+        # Threads are spawned lazily on first submit, i.e. after any fork.
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+        # Near-duplicate queries (cosine >= threshold) reuse the retrieved docs.
+        # Off by default: the response caches in chatbotlogic already serve
+        # near-duplicates on both the blocking and streaming paths, so this
+        # would mostly add a second similarity scan per miss. Set
+        # RETRIEVAL_CACHE_SIZE > 0 to catch queries just under their threshold
+        result_cache_size = int(os.getenv("RETRIEVAL_CACHE_SIZE", "0"))
+        self._result_cache: Optional[SemanticCache] = None
+        if result_cache_size > 0:
+            self._result_cache = SemanticCache(
+                threshold=float(os.getenv("RETRIEVAL_CACHE_THRESHOLD", "0.97")),
+                max_entries=result_cache_size,
+                ttl_seconds=float(os.getenv("RETRIEVAL_CACHE_TTL", "3600"))
+            )
         
-        if documents:
+        if prebuilt_bm25 is not None:
+            self.documents = prebuilt_bm25["documents"]
+            self._scorer = prebuilt_bm25["scorer"]
+            self._category_bm25 = prebuilt_bm25["category_bm25"]
+            print(f"[OK] Loaded prebuilt BM25 index with {len(self.documents)} documents")
+        elif documents:
             self._build_bm25_index(documents)
     
     def _build_bm25_index(self, documents: List[Document]):
@@ -124,12 +276,13 @@ class HybridRetriever:
         self.tokenized_docs = [
             self._tokenize(doc.page_content) for doc in documents
         ]
-        self.bm25 = BM25Okapi(self.tokenized_docs)
+        # Only the vectorized postings are kept; the BM25Okapi is just the fitter
+        self._scorer = SparseBM25Scorer.from_bm25(BM25Okapi(self.tokenized_docs))
         print(f"[OK] Built BM25 index with {len(documents)} documents")
 
         # Build per-category BM25 sub-indices for fast filtered search
-        # Key: department value, Value: (bm25_index, list_of_docs, list_of_original_indices)
-        self._category_bm25: Dict[str, tuple] = {}
+        # Key: department value, Value: (scorer, list_of_docs)
+        self._category_bm25 = {}
         categories: Dict[str, List] = {}
         for idx, doc in enumerate(documents):
             dept = doc.metadata.get('department', None)
@@ -140,22 +293,66 @@ class HybridRetriever:
 
         for dept, idx_docs in categories.items():
             cat_docs = [d for _, d in idx_docs]
-            cat_tokens = [self._tokenize(d.page_content) for d in cat_docs]
+            # Reuse the global tokenization instead of tokenizing every doc twice
+            cat_tokens = [self.tokenized_docs[idx] for idx, _ in idx_docs]
             self._category_bm25[dept] = (
-                BM25Okapi(cat_tokens),
+                SparseBM25Scorer.from_bm25(BM25Okapi(cat_tokens)),
                 cat_docs
             )
         print(f"[OK] Built {len(self._category_bm25)} per-category BM25 sub-indices: {list(self._category_bm25.keys())}")
     
+    def save_bm25_index(self, path: str, cache_key: str):
+        """
+        Persist the BM25 indices so the next process start can skip
+        extracting and tokenizing every chunk from ChromaDB.
+        The posting arrays go to .npy files next to the pickle (memory-mapped
+        by load_bm25_index); the pickle holds documents, terms and the key.
+        
+        Args:
+            path: File to write (e.g. <persist_directory>/bm25.pkl)
+            cache_key: Identifies the collection state the index was built from
+        """
+        if self._scorer is None:
+            return
+        
+        # Fresh tag per save: a running worker may still have the previous
+        # arrays mapped, so they are never overwritten in place
+        tag = f"{os.getpid()}-{time.time_ns()}"
+        self._scorer.save(f"{path}.{tag}.all")
+        category_state = {}
+        for i, (dept, (scorer, cat_docs)) in enumerate(self._category_bm25.items()):
+            scorer.save(f"{path}.{tag}.cat{i}")
+            category_state[dept] = (f"cat{i}", scorer.corpus_size, scorer.terms, cat_docs)
+        
+        state = {
+            "cache_key": cache_key,
+            "array_tag": tag,
+            "documents": self.documents,
+            "scorer": (self._scorer.corpus_size, self._scorer.terms),
+            "category_bm25": category_state,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)  # Atomic — a crash never leaves a half-written index
+        
+        # Arrays from earlier saves are unreachable now; unlinking is safe
+        # even while another process still has them mapped
+        for old in glob.glob(f"{glob.escape(path)}.*.npy"):
+            if not old.startswith(f"{path}.{tag}."):
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+        print(f"[OK] Saved BM25 index to {path}")
+    
     def _tokenize(self, text: str) -> List[str]:
         """Simple tokenization - lowercase and split on whitespace/punctuation"""
-        import re
-        # Remove special characters and lowercase
-        text = text.lower()
-        tokens = re.findall(r'\b\w+\b', text)
-        return tokens
+        return tokenize(text)
     
-    def semantic_search(self, query: str, k: int = 10, filter_dict: dict = None) -> List[Tuple[Document, float]]:
+    def semantic_search(
+        self, query: str, k: int = 10, filter_dict: dict = None, normalize: bool = True
+    ) -> List[Tuple[Document, float]]:
         """
         Perform semantic search using embeddings
         
@@ -163,22 +360,21 @@ class HybridRetriever:
             query: Search query
             k: Number of results
             filter_dict: Optional metadata filter
+            normalize: Convert distances to similarities. RRF fusion only uses
+                rank order, so hybrid callers pass False and get raw distances
         
         Returns:
             List of (document, score) tuples
         """
         try:
             results = self.vectorstore.similarity_search_with_score(query, k=k, filter=filter_dict)
-            # Normalize scores (ChromaDB returns distance, lower is better)
-            # Convert to similarity score (higher is better)
-            normalized = []
-            for doc, score in results:
-                # ChromaDB uses L2 distance, convert to similarity
-                similarity = 1 / (1 + score)
-                normalized.append((doc, similarity))
-            return normalized
+            if not normalize:
+                return results
+            # ChromaDB returns L2 distance (lower is better) — convert to a
+            # similarity score (higher is better)
+            return [(doc, 1 / (1 + score)) for doc, score in results]
         except Exception as e:
-            print(f"[ERROR] Semantic search failed: {e}")
+            logger.error("Semantic search failed: %s", e)
             return []
     
     def bm25_search(self, query: str, k: int = 10, filter_dict: dict = None) -> List[Tuple[Document, float]]:
@@ -187,32 +383,27 @@ class HybridRetriever:
         Uses per-category sub-index when filter_dict is provided — much faster
         than searching all 19k docs and filtering after.
         """
-        if self.bm25 is None or not self.documents:
+        if self._scorer is None or not self.documents:
             return []
 
         try:
-            tokenized_query = self._tokenize(query)
+            tokenized_query = _tokenize_query(query)
 
             # Use per-category sub-index if a department filter is specified
             if filter_dict and 'department' in filter_dict:
                 dept = filter_dict['department']
                 if dept in self._category_bm25:
-                    cat_bm25, cat_docs = self._category_bm25[dept]
-                    scores = cat_bm25.get_scores(tokenized_query)
-                    top_indices = np.argsort(scores)[::-1][:k]
+                    cat_scorer, cat_docs = self._category_bm25[dept]
+                    scores = cat_scorer.get_scores(tokenized_query)
                     results = [
                         (cat_docs[idx], float(scores[idx]))
-                        for idx in top_indices
-                        if scores[idx] > 0
+                        for idx in top_k_indices(scores, k)
                     ]
                 else:
                     # Unknown category — fall back to full search + manual filter
-                    scores = self.bm25.get_scores(tokenized_query)
-                    top_indices = np.argsort(scores)[::-1][:k * 10]
+                    scores = self._scorer.get_scores(tokenized_query)
                     results = []
-                    for idx in top_indices:
-                        if scores[idx] <= 0:
-                            break
+                    for idx in top_k_indices(scores, k * 10):
                         doc = self.documents[idx]
                         if all(doc.metadata.get(k2) == v for k2, v in filter_dict.items()):
                             results.append((doc, float(scores[idx])))
@@ -220,12 +411,10 @@ class HybridRetriever:
                                 break
             else:
                 # No filter — search all documents
-                scores = self.bm25.get_scores(tokenized_query)
-                top_indices = np.argsort(scores)[::-1][:k]
+                scores = self._scorer.get_scores(tokenized_query)
                 results = [
                     (self.documents[idx], float(scores[idx]))
-                    for idx in top_indices
-                    if scores[idx] > 0
+                    for idx in top_k_indices(scores, k)
                 ]
 
             # Normalize scores to 0-1 range
@@ -236,7 +425,7 @@ class HybridRetriever:
 
             return results
         except Exception as e:
-            print(f"[ERROR] BM25 search failed: {e}")
+            logger.error("BM25 search failed: %s", e)
             return []
     
     def hybrid_search(
@@ -270,45 +459,37 @@ class HybridRetriever:
         if not bm25_results:
             return semantic_results[:k]
         
-        # Reciprocal Rank Fusion (RRF)
-        # RRF score = 1 / (rank + constant)
-        rrf_constant = 60  # Commonly used constant
-        
-        # Calculate RRF scores
-        doc_scores: Dict[str, float] = {}
-        doc_objects: Dict[str, Document] = {}
-        
-        # Add semantic results with weighted RRF
-        for rank, (doc, score) in enumerate(semantic_results):
-            doc_id = self._get_doc_id(doc)
-            rrf_score = semantic_weight * (1 / (rank + rrf_constant))
-            doc_scores[doc_id] = doc_scores.get(doc_id, 0) + rrf_score
-            doc_objects[doc_id] = doc
-        
-        # Add BM25 results with weighted RRF
-        for rank, (doc, score) in enumerate(bm25_results):
-            doc_id = self._get_doc_id(doc)
-            rrf_score = bm25_weight * (1 / (rank + rrf_constant))
-            doc_scores[doc_id] = doc_scores.get(doc_id, 0) + rrf_score
-            if doc_id not in doc_objects:
-                doc_objects[doc_id] = doc
-        
-        # Sort by combined score
-        sorted_docs = sorted(
-            [(doc_objects[doc_id], score) for doc_id, score in doc_scores.items()],
-            key=lambda x: x[1],
-            reverse=True
+        return self._combine_results(
+            semantic_results, bm25_results, k,
+            semantic_weight=semantic_weight, bm25_weight=bm25_weight
         )
-        
-        return sorted_docs[:k]
     
     def _get_doc_id(self, doc: Document) -> str:
         """Generate a unique ID for a document"""
-        # Use content hash as ID
-        content = doc.page_content[:200]  # Use first 200 chars
+        # Hash of the full text: chunks of one page often open with the same
+        # section header, so a prefix would collide (and mix up their cached
+        # rerank features). blake2b rather than hash(), which is salted per
+        # process, so IDs (and RRF tie-breaking) are stable across restarts
         source = doc.metadata.get('source', '')
         page = doc.metadata.get('page', '')
-        return f"{source}_{page}_{hash(content)}"
+        digest = hashlib.blake2b(doc.page_content.encode('utf-8'), digest_size=16).hexdigest()
+        return f"{source}_{page}_{digest}"
+    
+    def _get_rerank_features(self, doc: Document) -> Tuple[frozenset, str]:
+        """
+        Tokens and lowercased text used by rerank, cached per document: the
+        same popular chunks are candidates for many queries, so they are
+        tokenized once instead of on every rerank
+        """
+        doc_id = self._get_doc_id(doc)
+        features = self._rerank_features.get(doc_id)
+        if features is None:
+            features = (
+                frozenset(self._tokenize(doc.page_content[:500])),
+                doc.page_content.lower()
+            )
+            self._rerank_features.put(doc_id, features)
+        return features
     
     def rerank(
         self, 
@@ -325,25 +506,26 @@ class HybridRetriever:
         reranked = []
         query_tokens = set(self._tokenize(query))
         
+        query_lower = query.lower()
+        
         for doc, base_score in documents:
             # Calculate additional relevance factors
-            doc_tokens = set(self._tokenize(doc.page_content[:500]))
+            doc_tokens, content_lower = self._get_rerank_features(doc)
             
             # Keyword overlap bonus
             overlap = len(query_tokens.intersection(doc_tokens))
             keyword_bonus = min(overlap * 0.02, 0.2)  # Max 20% bonus
             
             # Boost for exact phrase matches
-            if query.lower() in doc.page_content.lower():
+            if query_lower in content_lower:
                 keyword_bonus += 0.15
             
             # Final score
             final_score = base_score + keyword_bonus
             reranked.append((doc, final_score))
         
-        # Sort by final score
-        reranked.sort(key=lambda x: x[1], reverse=True)
-        return reranked[:top_k]
+        # Top top_k by final score
+        return heapq.nlargest(top_k, reranked, key=lambda x: x[1])
     
     def search(
         self,
@@ -356,28 +538,42 @@ class HybridRetriever:
         """
         Main search method — hybrid search with PARALLEL semantic + BM25 execution.
         Semantic and BM25 searches are independent, so they run concurrently
-        via a ThreadPoolExecutor, roughly halving retrieval latency.
+        on the retriever's thread pool, roughly halving retrieval latency.
         """
         t0 = time.time()
 
+        # Query embedding is memoized by CachedEmbeddings, so semantic_search
+        # below does not pay for it a second time
+        cache_namespace = f"{filter_dict}|{k}|{use_hybrid}|{use_rerank}"
+        query_embedding = None
+        embeddings = getattr(self.vectorstore, "embeddings", None)
+        if self._result_cache is not None and embeddings is not None:
+            try:
+                query_embedding = embeddings.embed_query(query)
+                cached = self._result_cache.lookup(query_embedding, cache_namespace)
+                if cached is not None:
+                    return list(cached)
+            except Exception as e:
+                logger.warning("Retrieval cache lookup failed (non-critical): %s", e)
+                query_embedding = None
+
         # Step 1: Expand query for BM25 (semantic handles meaning natively)
         expanded_query = expand_query(query)
         if expanded_query != query:
-            print(f"[Query Expansion] '{query[:50]}...' -> added legal synonyms")
+            logger.debug("[Query Expansion] '%s...' -> added legal synonyms", query[:50])
 
-        if use_hybrid and self.bm25 is not None:
+        if use_hybrid and self._scorer is not None:
             # ── Run semantic and BM25 in PARALLEL ──
-            with ThreadPoolExecutor(max_workers=2) as executor:
-                future_semantic = executor.submit(
-                    self.semantic_search, query, k * 2, filter_dict
-                )
-                future_bm25 = executor.submit(
-                    self.bm25_search, expanded_query, k * 2, filter_dict
-                )
-                semantic_results = future_semantic.result()
-                bm25_results = future_bm25.result()
-
-            print(f"[TIMING]   semantic={time.time() - t0:.2f}s parallel with bm25")
+            future_semantic = self._pool.submit(
+                self.semantic_search, query, k * 2, filter_dict, False
+            )
+            future_bm25 = self._pool.submit(
+                self.bm25_search, expanded_query, k * 2, filter_dict
+            )
+            semantic_results = future_semantic.result()
+            bm25_results = future_bm25.result()
+
+            logger.debug("[TIMING]   semantic=%.2fs parallel with bm25", time.time() - t0)
 
             # Combine using RRF
             results = self._combine_results(
@@ -392,33 +588,51 @@ class HybridRetriever:
         if use_rerank and results:
             results = self.rerank(query, results, top_k=k)
 
-        return [doc for doc, score in results[:k]]
+        docs = [doc for doc, score in results[:k]]
+        if query_embedding is not None and docs:
+            self._result_cache.add(query_embedding, docs, cache_namespace)
+        return docs
+
+    def clear_cache(self):
+        """Drop cached retrieval results (call after the vector store is rebuilt)"""
+        if self._result_cache is not None:
+            self._result_cache.clear()
     
-    def _combine_results(self, semantic_results, bm25_results, k: int):
-        """Combine semantic and BM25 results using RRF"""
-        rrf_constant = 60
-        doc_scores = {}
-        doc_objects = {}
+    def _combine_results(
+        self,
+        semantic_results: List[Tuple[Document, float]],
+        bm25_results: List[Tuple[Document, float]],
+        k: int,
+        semantic_weight: float = 0.6,
+        bm25_weight: float = 0.4
+    ) -> List[Tuple[Document, float]]:
+        """
+        Combine semantic and BM25 results using weighted Reciprocal Rank Fusion
+        (RRF score = weight / (rank + 60)). Fusion only ever sees a few dozen
+        candidates per side, so a dict keyed by doc ID beats allocating
+        corpus-sized arrays.
+        """
+        rrf_constant = 60  # Commonly used constant
+        doc_scores: Dict[str, float] = {}
+        doc_objects: Dict[str, Document] = {}
         
         for rank, (doc, score) in enumerate(semantic_results):
             doc_id = self._get_doc_id(doc)
-            rrf_score = 0.6 * (1 / (rank + rrf_constant))
-            doc_scores[doc_id] = doc_scores.get(doc_id, 0) + rrf_score
+            doc_scores[doc_id] = doc_scores.get(doc_id, 0) + semantic_weight / (rank + rrf_constant)
             doc_objects[doc_id] = doc
         
         for rank, (doc, score) in enumerate(bm25_results):
             doc_id = self._get_doc_id(doc)
-            rrf_score = 0.4 * (1 / (rank + rrf_constant))
-            doc_scores[doc_id] = doc_scores.get(doc_id, 0) + rrf_score
+            doc_scores[doc_id] = doc_scores.get(doc_id, 0) + bm25_weight / (rank + rrf_constant)
             if doc_id not in doc_objects:
                 doc_objects[doc_id] = doc
         
-        sorted_docs = sorted(
-            [(doc_objects[doc_id], score) for doc_id, score in doc_scores.items()],
-            key=lambda x: x[1],
-            reverse=True
+        # Top k by combined score
+        return heapq.nlargest(
+            k,
+            ((doc_objects[doc_id], score) for doc_id, score in doc_scores.items()),
+            key=lambda x: x[1]
         )
-        return sorted_docs[:k]
     
     def search_with_scores(
         self, 
@@ -430,7 +644,7 @@ class HybridRetriever:
         """
         Search and return documents with scores
         """
-        if use_hybrid and self.bm25 is not None:
+        if use_hybrid and self._scorer is not None:
             results = self.hybrid_search(query, k=k*2 if use_rerank else k)
         else:
             results = self.semantic_search(query, k=k*2 if use_rerank else k)
@@ -441,20 +655,74 @@ class HybridRetriever:
         return results[:k]
 
 
-def build_bm25_from_vectorstore(vectorstore) -> List[Document]:
+def load_bm25_index(path: str, cache_key: str) -> Optional[Dict[str, Any]]:
     """
-    Extract documents from ChromaDB to build BM25 index
+    Load a BM25 index saved by HybridRetriever.save_bm25_index
+    
+    Returns:
+        BM25 state for HybridRetriever(prebuilt_bm25=...), or None if the file
+        is missing, unreadable, or was built from a different collection state
+    """
+    if not os.path.exists(path):
+        return None
+    
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except Exception as e:
+        print(f"[WARN] Could not read BM25 index {path}: {e}")
+        return None
+    
+    if state.get("cache_key") != cache_key or "array_tag" not in state:
+        print(f"[*] BM25 index at {path} is stale — rebuilding")
+        return None
+    
+    prefix = f"{path}.{state['array_tag']}"
+    try:
+        corpus_size, terms = state["scorer"]
+        scorer = SparseBM25Scorer.load(f"{prefix}.all", corpus_size, terms)
+        category_bm25 = {
+            dept: (SparseBM25Scorer.load(f"{prefix}.{name}", size, cat_terms), cat_docs)
+            for dept, (name, size, cat_terms, cat_docs) in state["category_bm25"].items()
+        }
+    except Exception as e:
+        print(f"[WARN] Could not map BM25 arrays for {path}: {e}")
+        return None
+    
+    return {
+        "documents": state["documents"],
+        "scorer": scorer,
+        "category_bm25": category_bm25,
+    }
+
+
+# Rows fetched per collection.get() page when extracting documents for BM25
+EXTRACT_PAGE_SIZE = 5000
+
+
+def build_bm25_from_vectorstore(vectorstore, page_size: int = EXTRACT_PAGE_SIZE) -> List[Document]:
+    """
+    Extract documents from ChromaDB to build BM25 index.
+    Pages through the collection so only one page of raw rows is held
+    alongside the Document list, instead of a full copy of the corpus.
     """
     try:
-        # Get all documents from ChromaDB
         collection = vectorstore._collection
-        results = collection.get(include=['documents', 'metadatas'])
-        
         documents = []
-        for i, content in enumerate(results['documents']):
-            metadata = results['metadatas'][i] if results['metadatas'] else {}
-            doc = Document(page_content=content, metadata=metadata)
-            documents.append(doc)
+        offset = 0
+        while True:
+            results = collection.get(
+                include=['documents', 'metadatas'], limit=page_size, offset=offset
+            )
+            contents = results['documents']
+            if not contents:
+                break
+            metadatas = results['metadatas'] or [{}] * len(contents)
+            documents.extend(
+                Document(page_content=content, metadata=metadata or {})
+                for content, metadata in zip(contents, metadatas)
+            )
+            offset += len(contents)
         
         print(f"[OK] Extracted {len(documents)} documents from vector store")
         return documents
@@ -0,0 +1,165 @@
+"""
+Response Caches for RAG Pipeline
+- LRUCache: exact-match cache keyed by a normalized question
+- SemanticCache: returns a stored answer when a new question is a near-duplicate of one
+  already answered (cosine similarity of query embeddings above a threshold)
+Both let repeat questions skip retrieval and the LLM call.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Unit vectors are stored as int8 in [-127, 127]; a dot product of two of them
+# is rescaled by 127 * 127 to recover the cosine similarity
+_INT8_SCALE = 127
+_INT8_DOT_SCALE = float(_INT8_SCALE * _INT8_SCALE)
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different questions share a key"""
+    return " ".join(text.lower().split())
+
+
+class LRUCache:
+    """Thread-safe exact-match LRU cache"""
+
+    def __init__(self, maxsize: int = 512):
+        """
+        Initialize LRU cache
+
+        Args:
+            maxsize: Maximum number of entries (least recently used evicted first)
+        """
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key) -> Optional[Any]:
+        """Return the cached value for key (marking it recently used) or None"""
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value: Any):
+        """Store value under key, evicting the oldest entry when full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            self._data.clear()
+
+
+class SemanticCache:
+    """In-memory embedding -> response cache with cosine-threshold lookup and TTL"""
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600
+    ):
+        """
+        Initialize semantic cache
+
+        Args:
+            threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum entries kept per namespace (oldest evicted first)
+            ttl_seconds: How long an entry stays valid
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # namespace -> (int8 embedding matrix [n, dim], values, expiry timestamps)
+        self._entries: Dict[str, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    @classmethod
+    def _quantize(cls, embedding) -> np.ndarray:
+        """Normalize then quantize to int8 (4x smaller than float32)"""
+        return np.round(cls._normalize(embedding) * _INT8_SCALE).astype(np.int8)
+
+    def lookup(self, embedding, namespace: str = "") -> Optional[Any]:
+        """
+        Find a cached value whose embedding is similar enough to the query
+
+        Args:
+            embedding: Query embedding
+            namespace: Partition key (e.g. category filter) — entries never match across namespaces
+
+        Returns:
+            Cached value or None on a miss
+        """
+        query = self._quantize(embedding)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(namespace)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            matrix, values, expiries = entry
+            # Accumulate in int32 — int8 * int8 products summed over hundreds of dims overflow int16
+            similarities = np.matmul(matrix, query, dtype=np.int32) / _INT8_DOT_SCALE
+            best = int(np.argmax(similarities))
+
+            if similarities[best] >= self.threshold and expiries[best] > now:
+                self.hits += 1
+                return values[best]
+
+        self.misses += 1
+        return None
+
+    def add(self, embedding, value: Any, namespace: str = ""):
+        """
+        Store a value under the given query embedding
+
+        Args:
+            embedding: Query embedding
+            value: Value to cache (e.g. the RAG result dict)
+            namespace: Partition key
+        """
+        vec = self._quantize(embedding)[np.newaxis, :]
+        now = time.time()
+        expiry = now + self.ttl_seconds
+
+        with self._lock:
+            entry = self._entries.get(namespace)
+            if entry is None:
+                self._entries[namespace] = (vec, [value], [expiry])
+                return
+
+            matrix, values, expiries = entry
+
+            # Drop expired entries and the oldest ones beyond capacity
+            keep: List[int] = [i for i, exp in enumerate(expiries) if exp > now]
+            keep = keep[-(self.max_entries - 1):] if self.max_entries > 1 else []
+
+            matrix = np.vstack([matrix[keep], vec]) if keep else vec
+            values = [values[i] for i in keep] + [value]
+            expiries = [expiries[i] for i in keep] + [expiry]
+            self._entries[namespace] = (matrix, values, expiries)
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            self._entries.clear()
@@ -3,38 +3,95 @@ Vector Store Manager for RAG Pipeline - Simplified Version
 Uses TF-IDF embeddings (no external dependencies needed)
 """
 
+import hashlib
 import os
-from typing import List, Optional
+import threading
+from typing import Dict, List, Optional
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_huggingface import HuggingFaceEmbeddings
 from dotenv import load_dotenv
+from embedding_batcher import BatchingEmbeddings
+from embedding_cache import CachedEmbeddings
 
 load_dotenv()
 
 
-class VectorStoreManager:
-    """Manage ChromaDB vector store for document retrieval"""
-    
-    def __init__(
-        self, 
-        persist_directory: str = "vectorstores/chroma_db",
-        collection_name: str = "paklaw_docs"
-    ):
-        """
-        Initialize vector store manager with local embeddings
+_embeddings: Optional[Embeddings] = None
+_embeddings_lock = threading.Lock()
+
+# Texts per model forward pass inside embed_documents. Ingest hands the
+# model thousands of chunks per call; sentence-transformers' default of 32
+# leaves a small model like MiniLM under-filling the CPU per pass, and a
+# GPU needs far larger batches still. EMBED_ENCODE_BATCH_SIZE overrides.
+CPU_ENCODE_BATCH_SIZE = 64
+ACCELERATOR_ENCODE_BATCH_SIZE = 256
+
+# EMBED_BACKEND=onnx runs the model on ONNX Runtime (needs
+# optimum[onnxruntime]) using one of the exports shipped in the model repo;
+# the default is the int8 dynamic-quantized VNNI build, several times faster
+# than FP32 torch on CPU. Vectors differ slightly between backends, so ingest
+# and serving should use the same setting.
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+EMBED_ONNX_FILE = os.getenv("EMBED_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+
+
+def embedding_device() -> str:
+    """
+    EMBED_DEVICE if set (cpu/cuda/mps), otherwise the best available device.
+    Ingest picks up a GPU automatically; the API server pins cpu (see
+    gunicorn.conf.py) because a CUDA context must not cross its pre-fork.
+    """
+    device = os.getenv("EMBED_DEVICE", "auto")
+    if device != "auto":
+        return device
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "cuda"
+        if torch.backends.mps.is_available():
+            return "mps"
+    except Exception:
+        pass
+    return "cpu"
+
+
+def _encode_kwargs(device: str) -> dict:
+    default = CPU_ENCODE_BATCH_SIZE if device == "cpu" else ACCELERATOR_ENCODE_BATCH_SIZE
+    batch_size = int(os.getenv("EMBED_ENCODE_BATCH_SIZE") or default)
+    return {'normalize_embeddings': True, 'batch_size': batch_size}
+
+
+def _model_kwargs(device: str, **extra) -> dict:
+    """SentenceTransformer constructor kwargs for the configured backend"""
+    kwargs = {'device': device, **extra}
+    if EMBED_BACKEND == "onnx":
+        kwargs['backend'] = 'onnx'
+        kwargs['model_kwargs'] = {'file_name': EMBED_ONNX_FILE}
+    return kwargs
+
+
+def get_embeddings() -> Embeddings:
+    """
+    Load the sentence-transformers model once per process.
         
-        Args:
-            persist_directory: Directory to store ChromaDB data
-            collection_name: Name of the collection
-        """
-        self.persist_directory = persist_directory
-        self.collection_name = collection_name
+    Calling this in a pre-fork server's master (see gunicorn.conf.py) lets
+    every worker inherit the weights copy-on-write instead of loading its own
+    copy. Only the weights are loaded here — no inference, no threads — so
+    the fork is safe; the batching thread starts lazily in each worker.
+    """
+    global _embeddings
+    if _embeddings is not None:
+        return _embeddings
+    with _embeddings_lock:
+        if _embeddings is not None:
+            return _embeddings
         
-        print(f"[*] Initializing HuggingFace sentence-transformers embeddings...")
+        device = embedding_device()
+        print(f"[*] Initializing HuggingFace sentence-transformers embeddings ({EMBED_BACKEND} backend, {device})...")
         
         # Suppress HuggingFace Hub warnings and errors
-        import os
         import warnings
         warnings.filterwarnings("ignore")
         os.environ['HF_HUB_DISABLE_TELEMETRY'] = '1'
@@ -43,13 +100,10 @@ class VectorStoreManager:
         
         # Use HuggingFace embeddings with all-MiniLM-L6-v2 model
         try:
-            self.embeddings = HuggingFaceEmbeddings(
+            embeddings = HuggingFaceEmbeddings(
                 model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={
-                    'device': 'cpu',
-                    'trust_remote_code': True
-                },
-                encode_kwargs={'normalize_embeddings': True}
+                model_kwargs=_model_kwargs(device, trust_remote_code=True),
+                encode_kwargs=_encode_kwargs(device)
             )
             print(f"[OK] Embeddings initialized successfully")
         except Exception as e:
@@ -58,19 +112,77 @@ class VectorStoreManager:
             
             try:
                 # Try loading from cache only
-                self.embeddings = HuggingFaceEmbeddings(
+                embeddings = HuggingFaceEmbeddings(
                     model_name="sentence-transformers/all-MiniLM-L6-v2",
-                    model_kwargs={
-                        'device': 'cpu',
-                        'local_files_only': True
-                    },
-                    encode_kwargs={'normalize_embeddings': True}
+                    model_kwargs=_model_kwargs(device, local_files_only=True),
+                    encode_kwargs=_encode_kwargs(device)
                 )
                 print(f"[OK] Embeddings loaded from cache")
             except Exception as e2:
                 print(f"[ERROR] Could not load embeddings: {e2}")
                 raise
         
+        # Coalesce concurrent query embeddings into one forward pass.
+        # Single-user deployments can set EMBED_BATCHING=0 to skip the
+        # batching wait (EMBED_BATCH_WAIT_MS) on every query.
+        if os.getenv("EMBED_BATCHING", "1") == "1":
+            embeddings = BatchingEmbeddings(
+                embeddings,
+                max_batch=int(os.getenv("EMBED_BATCH_SIZE", "16")),
+                max_wait_ms=float(os.getenv("EMBED_BATCH_WAIT_MS", "10"))
+            )
+        
+        # Repeated queries skip the model entirely (in-process LRU, then a
+        # SQLite file shared across workers). EMBED_CACHE_PATH="" keeps the
+        # cache in memory only.
+        cache_path = os.getenv("EMBED_CACHE_PATH", ".cache/qembed.sqlite")
+        namespace = f"all-MiniLM-L6-v2|{EMBED_BACKEND}"
+        if EMBED_BACKEND == "onnx":
+            namespace += f"|{EMBED_ONNX_FILE}"
+        embeddings = CachedEmbeddings(
+            embeddings,
+            path=cache_path or None,
+            namespace=namespace,
+            maxsize=int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+        )
+        
+        _embeddings = embeddings
+    return _embeddings
+
+
+class VectorStoreManager:
+    """Manage ChromaDB vector store for document retrieval"""
+    
+    # HNSW graph parameters applied when a collection is created.
+    # Chroma has no int8/PQ index, so search cost is tuned through the
+    # graph instead: M=16 keeps the graph compact, construction_ef=200
+    # gives good recall, search_ef=128 bounds per-query candidate visits.
+    # Space stays L2 — HybridRetriever converts L2 distance to similarity.
+    HNSW_METADATA = {
+        "hnsw:space": "l2",
+        "hnsw:M": 16,
+        "hnsw:construction_ef": 200,
+        "hnsw:search_ef": 128,
+    }
+    
+    def __init__(
+        self, 
+        persist_directory: str = "vectorstores/chroma_db",
+        collection_name: str = "paklaw_docs"
+    ):
+        """
+        Initialize vector store manager with local embeddings
+        
+        Args:
+            persist_directory: Directory to store ChromaDB data
+            collection_name: Name of the collection
+        """
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        
+        # One model instance per process, shared by every manager
+        self.embeddings = get_embeddings()
+        
         # Create persist directory if it doesn't exist
         os.makedirs(persist_directory, exist_ok=True)
         
@@ -93,7 +205,8 @@ class VectorStoreManager:
                 documents=documents,
                 embedding=self.embeddings,  # Explicitly pass embeddings
                 persist_directory=self.persist_directory,
-                collection_name=self.collection_name
+                collection_name=self.collection_name,
+                collection_metadata=self.HNSW_METADATA
             )
             
             print(f"[OK] Vector store created successfully at {self.persist_directory}")
@@ -145,6 +258,91 @@ class VectorStoreManager:
             print(f"[ERROR] adding documents: {str(e)}")
             raise
     
+    @staticmethod
+    def chunk_id(document: Document) -> str:
+        """Deterministic ID from department + text, so re-ingesting a chunk overwrites it"""
+        key = f"{document.metadata.get('department', '')}\x00{document.page_content}"
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+    
+    def bulk_upsert(self, documents: List[Document], batch_size: int = 5000, skip_existing: bool = True) -> int:
+        """
+        Embed and upsert documents straight into the Chroma collection.
+        Embeddings are computed in one embed_documents call per batch and
+        written with a single collection.upsert, skipping LangChain's
+        per-call glue; content-derived IDs make re-runs idempotent.
+        Creates the collection (with HNSW_METADATA) if none is loaded.
+        
+        Args:
+            documents: List of Document objects to store
+            batch_size: Documents per upsert (Chroma caps a write at ~5.4k)
+            skip_existing: Don't re-embed documents whose ID is already stored.
+                The ID covers the department and the full text (header included),
+                so the stored embedding is for identical input.
+        
+        Returns:
+            Number of documents actually written (excludes already-stored IDs
+            and repeats within a batch)
+        """
+        if self.vectorstore is None:
+            self.vectorstore = Chroma(
+                embedding_function=self.embeddings,
+                persist_directory=self.persist_directory,
+                collection_name=self.collection_name,
+                collection_metadata=self.HNSW_METADATA
+            )
+        collection = self.vectorstore._collection
+        
+        try:
+            written = 0
+            for start in range(0, len(documents), batch_size):
+                # Chroma rejects duplicate IDs within one write
+                batch = {self.chunk_id(doc): doc for doc in documents[start:start + batch_size]}
+                if skip_existing:
+                    # ID-only lookup: no embeddings or documents are read back
+                    for doc_id in collection.get(ids=list(batch.keys()), include=[])["ids"]:
+                        del batch[doc_id]
+                    if not batch:
+                        continue
+                texts = [doc.page_content for doc in batch.values()]
+                collection.upsert(
+                    ids=list(batch.keys()),
+                    embeddings=self.embeddings.embed_documents(texts),
+                    documents=texts,
+                    metadatas=[doc.metadata for doc in batch.values()]
+                )
+                written += len(batch)
+            print(f"[OK] Upserted {written} documents into vector store ({len(documents) - written} already stored or repeated)")
+            return written
+        except Exception as e:
+            print(f"[ERROR] upserting documents: {str(e)}")
+            raise
+    
+    def add_duplicate_sources(self, duplicates: Dict[str, List[str]], batch_size: int = 5000):
+        """
+        Record on stored chunks the other places their text was also found,
+        as a "; "-joined 'duplicate_sources' metadata string (Chroma metadata
+        values must be scalars). Merges with sources recorded by earlier runs.
+        
+        Args:
+            duplicates: chunk ID -> ["source p.page", ...] of dropped duplicates
+            batch_size: IDs per get/update call
+        """
+        if not duplicates or self.vectorstore is None:
+            return
+        collection = self.vectorstore._collection
+        ids = list(duplicates)
+        for start in range(0, len(ids), batch_size):
+            stored = collection.get(ids=ids[start:start + batch_size], include=["metadatas"])
+            metadatas = []
+            for doc_id, metadata in zip(stored["ids"], stored["metadatas"]):
+                metadata = dict(metadata or {})
+                recorded = [s for s in (metadata.get("duplicate_sources") or "").split("; ") if s]
+                recorded += [s for s in duplicates[doc_id] if s not in recorded]
+                metadata["duplicate_sources"] = "; ".join(recorded)
+                metadatas.append(metadata)
+            if metadatas:
+                collection.update(ids=stored["ids"], metadatas=metadatas)
+    
     def search(
         self, 
         query: str, 
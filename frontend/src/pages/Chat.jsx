@@ -1,4 +1,4 @@
-import { sendChatMessage } from '../services/api';
+import { streamChatMessage } from '../services/api';
 import { useState, useRef, useEffect, useCallback } from 'react';
 import { useNavigate, useSearchParams } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
@@ -229,6 +229,7 @@ function Chat() {
     const [messages, setMessages] = useState([]);
     const [inputValue, setInputValue] = useState('');
     const [isLoading, setIsLoading] = useState(false);
+    const [streamingMessageId, setStreamingMessageId] = useState(null);
     const [showHistory, setShowHistory] = useState(false);
     const [chatHistory, setChatHistory] = useState([]);
     const [currentConversationId, setCurrentConversationId] = useState(null);
@@ -536,12 +537,23 @@ function Chat() {
 
         try {
             abortControllerRef.current = new AbortController();
-            const result = await sendChatMessage(messageText, true, category, abortControllerRef.current.signal);
+            // Show the answer while it streams in under a temporary ID
+            const streamId = Date.now() + 1;
+            let streamStarted = false;
+            const result = await streamChatMessage(messageText, true, category, abortControllerRef.current.signal, (text) => {
+                if (!streamStarted) {
+                    streamStarted = true;
+                    setStreamingMessageId(streamId);
+                    setMessages(prev => [...prev, { id: streamId, type: 'bot', content: text, timestamp: new Date() }]);
+                } else {
+                    setMessages(prev => prev.map(msg => msg.id === streamId ? { ...msg, content: text } : msg));
+                }
+            });
             // Save bot response to database first to get the real ID
             const savedMsg = await saveMessage(convId, 'bot', result.response);
 
             const botMessage = {
-                id: savedMsg?.id || Date.now() + 1,
+                id: savedMsg?.id || streamId,
                 type: 'bot',
                 content: result.response,
                 feedback: null,
@@ -549,7 +561,9 @@ function Chat() {
                 sources: result.sources || [],
                 followUps: getFollowUpSuggestions(category, messageText)
             };
-            setMessages(prev => [...prev, botMessage]);
+            setMessages(prev => streamStarted
+                ? prev.map(msg => msg.id === streamId ? botMessage : msg)
+                : [...prev, botMessage]);
 
             // Refresh chat history in sidebar
             await loadChatHistory();
@@ -576,6 +590,7 @@ function Chat() {
             }
         } finally {
             setIsLoading(false);
+            setStreamingMessageId(null);
             abortControllerRef.current = null;
         }
     };
@@ -1000,7 +1015,7 @@ function Chat() {
                                 </div>
                             ))}
 
-                            {isLoading && (
+                            {isLoading && !streamingMessageId && (
                                 <div className="message bot-message">
                                     <div className="message-avatar bot-msg-avatar">⚖️</div>
                                     <div className="message-body">
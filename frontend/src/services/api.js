@@ -25,4 +25,63 @@ export const sendChatMessage = async (message, useRag = true, category = null, s
         console.error('API Error:', error);
         throw error;
     }
-};
\ No newline at end of file
+};
+
+// Streams the answer from /api/chat/stream (Server-Sent Events) so text shows
+// up as soon as the first token is generated. onToken receives the full text
+// received so far; resolves with the same shape as sendChatMessage.
+export const streamChatMessage = async (message, useRag = true, category = null, signal = null, onToken = null) => {
+    try {
+        const response = await fetch(`${API_URL}/api/chat/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                message: message,
+                use_rag: useRag,
+                category: category,
+            }),
+            signal: signal,
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error('Failed to get response');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let text = '';
+        let sources = [];
+        let contextUsed = false;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // Events are separated by a blank line; keep any partial tail
+            const frames = buffer.split('\n\n');
+            buffer = frames.pop();
+
+            for (const frame of frames) {
+                if (!frame.startsWith('data: ')) continue;
+                const event = JSON.parse(frame.slice(6));
+
+                if (event.type === 'sources') {
+                    sources = event.sources || [];
+                    contextUsed = event.context_used;
+                } else if (event.type === 'token' || event.type === 'error') {
+                    text += event.content;
+                    onToken?.(text);
+                }
+            }
+        }
+
+        return { response: text, sources: sources, context_used: contextUsed };
+    } catch (error) {
+        console.error('API Error:', error);
+        throw error;
+    }
+};
@@ -11,7 +11,7 @@ call conda activate paklawchatbot
 
 echo.
 echo Installing dependencies via pip...
-pip install pypdf2 chromadb langchain-chroma langchain-community --quiet
+pip install pypdf2 pypdfium2 chromadb langchain-chroma langchain-community --quiet
 
 echo.
 echo ============================================================